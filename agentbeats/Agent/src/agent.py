@@ -1,7 +1,10 @@
+import asyncio
 import difflib
+import json
+from uuid import uuid4
 
 from a2a.server.tasks import TaskUpdater
-from a2a.types import Message, TaskState, Part, TextPart
+from a2a.types import Message, TaskState, Part, TextPart, DataPart
 from a2a.utils import get_message_text, new_agent_text_message
 from llm import *
 from dotenv import load_dotenv
@@ -10,15 +13,16 @@ from messenger import Messenger
 
 load_dotenv()
 
+# structured arena messages (protocol version 2), advertised in the agent card
+PROTOCOL_URI = "https://github.com/ReserveJudgement/SocialCOMPACT/protocol/v2"
+
 class Agent:
-    def __init__(self):
+    def __init__(self, persona: dict | None = None):
         self.messenger = Messenger()
         # Initialize other state here
-        platform = os.getenv("PLATFORM")
-        model = os.getenv("MODEL")
-        print("initialized ", platform, model)
-        api_key = os.getenv("API_KEY")
-        self.model = Model(platform, model, api_key)
+        # the persona selects the model, by default from the PLATFORM/MODEL/API_KEY environment variables
+        self.model = persona_model(persona)
+        print("initialized ", self.model.provider, self.model.model)
         self.name = ""
         self.background = ""
         self.others = []
@@ -27,6 +31,137 @@ class Agent:
         self.predictions = {}
         self.action = None
         self.history = "The game has just begun, nothing has happened yet."
+        self.reflection = None # background update of the history, started by an observation
+        self.usage = {} # task -> token usage not yet reported to the arena
+        # static game text sent once by the arena (protocol version 2)
+        self.templates = {}
+        self.action_format = {}
+        self.decision_prompt = ""
+
+    def state(self) -> dict:
+        """Conversational state of the agent, to be kept in a session store between messages"""
+        return {"name": self.name,
+                "background": self.background,
+                "others": self.others,
+                "preferences": self.preferences,
+                "chats": self.chats,
+                "predictions": self.predictions,
+                "action": self.action,
+                "history": self.history,
+                "templates": self.templates,
+                "action_format": self.action_format,
+                "decision_prompt": self.decision_prompt,
+                "usage": self.usage}
+
+    def restore(self, state: dict) -> None:
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    async def reflect(self, instruction: list) -> None:
+        """Update the history summary, in the background after an observation was acknowledged"""
+        try:
+            response = await asyncio.to_thread(self.model, instruction)
+        except Exception as e:
+            print(f"Reflection failed: {e}")
+            return
+        self.count("observe", instruction, str(response))
+        print(response)
+        if response is not None:
+            self.history = str(response)
+
+    def count(self, task: str, instruction: list, response: str) -> None:
+        """Add the token usage of a model call to the usage not yet reported"""
+        usage = self.model.usage(instruction, response)
+        counts = self.usage.setdefault(task, {"input_tokens": 0, "output_tokens": 0, "requests": 0})
+        counts["input_tokens"] += usage["input_tokens"]
+        counts["output_tokens"] += usage["output_tokens"]
+        counts["requests"] += 1
+
+    def report(self) -> dict:
+        """
+        Response metadata with the token usage per task since the last response.
+        Reflections finish after their observation was acknowledged, so they are reported with the next response.
+        """
+        usage, self.usage = self.usage, {}
+        return {"usage": usage, "model": f"{self.model.provider}/{self.model.model}"}
+
+    async def settle(self) -> None:
+        """Wait for a reflection that is still running, so the next prompt has the updated history"""
+        if self.reflection is not None:
+            await self.reflection
+            self.reflection = None
+
+    def decode(self, message: Message) -> dict:
+        """
+        Incoming arena message as {"task", "message", "info"}.
+        Structured (version 2) messages only carry what changed, the prompt is rendered from the cached static text.
+        """
+        data = next((part.root.data for part in message.parts if isinstance(part.root, DataPart)), None)
+        if data is None:
+            return json.loads(get_message_text(message))
+        static = data.get("static") or {}
+        self.templates.update(static.get("templates", {}))
+        self.action_format.update(static.get("action_format", {}))
+        if "message" in data:
+            return {"task": data["task"], "message": data["message"], "info": data.get("info")}
+        params = data.get("params", {})
+        info = data.get("info")
+        if isinstance(info, dict) and ("message" in params) and ("message" not in info):
+            # chat replies carry the message once, in the params
+            info = dict(info, message=params["message"])
+        prompt = self.templates[data["template"]].format(name=self.name, **self.action_format, **params)
+        if data["task"] == "act":
+            # retries build on the decision prompt of the round
+            if data["template"] == "act":
+                self.decision_prompt = ""
+            self.decision_prompt += prompt
+            prompt = self.decision_prompt
+        return {"task": data["task"], "message": prompt, "info": info}
+
+    async def generate(self, task: str, instruction: list, message: Message, updater: TaskUpdater) -> str:
+        """
+        Get the LLM response to the instruction, counting its token usage for the task.
+        If the message metadata asks for streaming, the response is forwarded as artifact chunks while it is generated,
+        and generation stops as soon as the requested closing tag appears.
+        """
+        options = message.metadata or {}
+        if not options.get("stream"):
+            # provider calls are blocking, so run them off the event loop to let other games proceed meanwhile
+            response = str(await asyncio.to_thread(self.model, instruction))
+            self.count(task, instruction, response)
+            return response
+        stop = options.get("stop")
+        artifact_id = uuid4().hex
+        text = ""
+        chunks = self.model.stream(instruction)
+        while True:
+            # the provider stream is blocking, so pull it off the event loop to let chunks go out
+            chunk = await asyncio.to_thread(next, chunks, None)
+            if chunk is None:
+                chunk = ""
+                break
+            text += chunk
+            if (stop is not None) and (stop in text[-(len(chunk) + len(stop)):]):
+                break
+            await updater.add_artifact(parts=[Part(root=TextPart(text=chunk))], artifact_id=artifact_id,
+                                       name="Response", append=len(text) > len(chunk), last_chunk=False)
+        # the last chunk (with the closing tag) carries the usage, as the arena stops reading at the tag
+        self.count(task, instruction, text)
+        await updater.add_artifact(parts=[Part(root=TextPart(text=chunk))], artifact_id=artifact_id,
+                                   name="Response", append=len(text) > len(chunk), last_chunk=True,
+                                   metadata=self.report())
+        # closing the generator also closes the provider stream, dropping the rest of the response
+        await asyncio.to_thread(chunks.close)
+        return text
+
+    async def respond(self, response: str, message: Message, updater: TaskUpdater) -> None:
+        """Complete the task with the response, unless it was already streamed as an artifact"""
+        if (message.metadata or {}).get("stream"):
+            await updater.complete()
+        else:
+            reply = new_agent_text_message(response)
+            reply.metadata = self.report()
+            await updater.update_status(TaskState.completed, reply)
 
     async def run(self, message: Message, updater: TaskUpdater) -> None:
         """Implement your agent logic here.
@@ -37,12 +172,16 @@ class Agent:
 
         Use self.messenger.talk_to_agent(message, url) to call other agents.
         """
-        input_text = get_message_text(message)
+        incoming = self.decode(message)
+        await self.settle()
 
-        incoming = json.loads(input_text)
+        # Health check
+        if incoming["task"] == "ping":
+            await updater.update_status(
+                TaskState.completed, new_agent_text_message("pong"))
 
         # Onboarding
-        if incoming["task"] == "background":
+        elif incoming["task"] == "background":
             print("getting background")
             self.name = incoming["info"]["name"]
             self.others = incoming["info"]["opponents"]
@@ -64,21 +203,25 @@ class Agent:
             await updater.update_status(
                 TaskState.working, new_agent_text_message("Chatting..."))
             interlocutor = str(incoming["info"]["from"])
-            if interlocutor not in self.others:
-                interlocutor = difflib.get_close_matches(interlocutor, self.others, n=1)[0]
-                print("approximated iterlocutor: ", interlocutor)
-            assert isinstance(interlocutor, str)
-            new_message = {"from": interlocutor, "to": self.name, "message": str(incoming["info"]["message"])}
+            if interlocutor == "Public":
+                # public channel: the posts since this agent's last one
+                new_messages = list(incoming["info"].get("posts", []))
+                self.chats.setdefault(interlocutor, [])
+            else:
+                if interlocutor not in self.others:
+                    interlocutor = difflib.get_close_matches(interlocutor, self.others, n=1)[0]
+                    print("approximated iterlocutor: ", interlocutor)
+                assert isinstance(interlocutor, str)
+                new_messages = [{"from": interlocutor, "to": self.name, "message": str(incoming["info"]["message"])}]
             prompt = (str(self.background) + "\n" + str(self.history) + "\n" +
                       "Chats this round so far:\n" + str(json.dumps(self.chats)) + "\n" + incoming["message"])
-            self.chats[interlocutor].append(new_message)
+            self.chats[interlocutor] += new_messages
             # Get LLM response
             instruction = [{"role": "user", "content": prompt}]
-            response = str(self.model(instruction))
+            response = await self.generate(incoming["task"], instruction, message, updater)
             print(response)
             self.chats[interlocutor].append({"from": self.name, "to": interlocutor, "message": response})
-            await updater.update_status(
-                TaskState.completed, new_agent_text_message(response))
+            await self.respond(response, message, updater)
 
         # Predict
         elif incoming["task"] == "predict":
@@ -94,11 +237,10 @@ class Agent:
                       "\nChats this round:\n" + json.dumps(self.chats) + "\n" + str(incoming["message"]))
             # Get LLM response
             instruction = [{"role": "user", "content": prompt}]
-            response = str(self.model(instruction))
+            response = await self.generate(incoming["task"], instruction, message, updater)
             print(response)
             self.predictions[subject] = response
-            await updater.update_status(
-                TaskState.completed, new_agent_text_message(response))
+            await self.respond(response, message, updater)
 
         # Act
         elif incoming["task"] == "act":
@@ -111,29 +253,23 @@ class Agent:
                       "\n" + str(incoming["message"]))
             # Get LLM response
             instruction = [{"role": "user", "content": prompt}]
-            response = str(self.model(instruction))
+            response = await self.generate(incoming["task"], instruction, message, updater)
             print(response)
             self.action = response
-            await updater.update_status(
-                TaskState.completed, new_agent_text_message(response))
+            await self.respond(response, message, updater)
 
         # Observe and reflect
         elif incoming["task"] == "observe":
             print("observing")
-            await updater.update_status(
-                TaskState.working, new_agent_text_message("Reflecting..."))
             prompt = (self.background + "\nHistory before this round: " + self.history +
                       "\nChats this round:\n" + json.dumps(self.chats) +
                       "\nYour predictions for this round were:\n" + json.dumps(self.predictions) +
                       "\nYour actions this round were: " + str(self.action) +
                       f"\nWrite an updated summary of the game from the perspective of {self.name}. " +
                       "Be concise and include lessons for future decisions in the game.")
-            # Get LLM response
+            # Acknowledge right away and reflect in the background, the next message waits for it
             instruction = [{"role": "user", "content": prompt}]
-            response = self.model(instruction)
-            print(response)
-            if response is not None:
-                self.history = str(response)
+            self.reflection = asyncio.create_task(self.reflect(instruction))
 
         """
         await updater.update_status(
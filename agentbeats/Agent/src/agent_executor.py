@@ -1,4 +1,8 @@
+import asyncio
 import os
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
 
 from a2a.server.agent_execution import AgentExecutor, RequestContext
 from a2a.server.events import EventQueue
@@ -16,6 +20,8 @@ from a2a.utils import (
 )
 
 from agent import Agent
+from profiling import Profiler
+from session_store import InMemorySessionStore
 
 TERMINAL_STATES = {
     TaskState.completed,
@@ -26,8 +32,21 @@ TERMINAL_STATES = {
 
 
 class Executor(AgentExecutor):
-    def __init__(self):
+    def __init__(self, persona: dict | None = None, sessions=None, profiler: Profiler | None = None,
+                 profile_path: str | None = None):
+        self.persona = persona # model configuration of the agents, None for the environment defaults
+        # agent state per context, shared between workers if the store is
+        # messages of a context (one game) mutate the same agent, so the store hands a context to one message at a time,
+        # in arrival order; different contexts run concurrently
+        self.sessions = sessions or InMemorySessionStore()
+        # agents are kept with the same time to live and limit as the sessions of the store
         self.agents: dict[str, Agent] = {} # context_id to agent instance
+        self.used: OrderedDict[str, float] = OrderedDict() # context_id to time of its last message, oldest first
+        self.active: dict[str, int] = {} # context_id to number of messages in progress
+        self.background = set() # sessions being saved after the response was sent
+        # optional profile of the run handler, written to profile_path every few seconds while the server is idle
+        self.profiler = profiler
+        self.profile_path = profile_path
 
     async def execute(self, context: RequestContext, event_queue: EventQueue) -> None:
         msg = context.message
@@ -43,21 +62,71 @@ class Executor(AgentExecutor):
             await event_queue.enqueue_event(task)
 
         context_id = task.context_id
-        agent = self.agents.get(context_id)
-        if not agent:
-            agent = Agent()
-            self.agents[context_id] = agent
+        self.active[context_id] = self.active.get(context_id, 0) + 1
 
         updater = TaskUpdater(event_queue, task.id, context_id)
 
-        await updater.start_work()
         try:
-            await agent.run(msg, updater)
+            await updater.start_work()
+            await self.sessions.acquire(context_id)
+        except BaseException:
+            self.leave(context_id)
+            raise
+        agent = self.agents.get(context_id)
+        try:
+            # another worker may have handled the last message of the context, if the store is shared
+            if (agent is None) or self.sessions.shared:
+                state = await self.sessions.load(context_id)
+                if agent is None:
+                    agent = Agent(self.persona)
+                    self.agents[context_id] = agent
+                if state is not None:
+                    agent.restore(state)
+            with self.profiler or nullcontext():
+                await agent.run(msg, updater)
             if not updater._terminal_state_reached:
                 await updater.complete()
         except Exception as e:
             print(f"Task failed with agent error: {e}")
             await updater.failed(new_agent_text_message(f"Agent error: {e}", context_id=context_id, task_id=task.id))
+        finally:
+            if self.profiler is not None:
+                self.profiler.dump(self.profile_path, interval=5)
+            # an observation is acknowledged before its reflection is done,
+            # so the session is saved and handed to the next message in the background
+            saving = asyncio.create_task(self.save(context_id, agent))
+            self.background.add(saving)
+            saving.add_done_callback(self.background.discard)
+
+    async def save(self, context_id: str, agent: Agent | None) -> None:
+        try:
+            if agent is not None:
+                await agent.settle()
+                await self.sessions.save(context_id, agent.state())
+        finally:
+            await self.sessions.release(context_id)
+            self.leave(context_id)
+
+    def leave(self, context_id: str) -> None:
+        self.active[context_id] -= 1
+        if self.active[context_id] == 0:
+            del self.active[context_id]
+        self.used[context_id] = time.monotonic()
+        self.used.move_to_end(context_id)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop the agents of expired and least recently used contexts, except those with a message in progress"""
+        now = time.monotonic()
+        expired = []
+        for context_id, used in self.used.items():
+            if (now - used <= self.sessions.ttl) and (len(self.used) - len(expired) <= self.sessions.max_sessions):
+                break
+            if context_id not in self.active:
+                expired.append(context_id)
+        for context_id in expired:
+            del self.used[context_id]
+            self.agents.pop(context_id, None)
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
         raise ServerError(error=UnsupportedOperationError())
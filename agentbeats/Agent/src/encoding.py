@@ -0,0 +1,55 @@
+import base64
+import gzip
+
+from a2a.types import DataPart, FilePart, FileWithBytes, Part
+from pydantic_core import to_json
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Artifacts are sent as a JSON data part, or compressed JSON in a file part with the content type of the compression.
+# The arena card lists the encodings it can produce (ARTIFACT_URI extension), and the request picks one in its config.
+ARTIFACT_URI = "https://github.com/ReserveJudgement/SocialCOMPACT/artifacts/v1"
+CONTENT_TYPES = {"gzip": "application/gzip", "zstd": "application/zstd"}
+EXTENSIONS = {"gzip": ".json.gz", "zstd": ".json.zst"}
+
+
+def artifact_encodings() -> list[str]:
+    """Encodings available here, zstd only with the zstandard package"""
+    return ["none", "gzip"] + (["zstd"] if zstandard is not None else [])
+
+
+def artifact_part(data: dict, encoding: str = "none", name: str = "artifact") -> Part:
+    """Artifact part: the data itself, or its JSON compressed in a file part"""
+    if encoding == "none":
+        return Part(root=DataPart(data=data))
+    # serialized like the data part would be on the wire (compact, tuple keys joined), numpy scalars as numbers
+    raw = to_json(data, fallback=lambda o: o.item() if hasattr(o, "item") else str(o))
+    if encoding == "gzip":
+        raw = gzip.compress(raw, compresslevel=6)
+    elif encoding == "zstd":
+        raw = zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        raise ValueError(f"Unknown artifact encoding: {encoding}, expected one of {artifact_encodings()}")
+    return Part(root=FilePart(file=FileWithBytes(bytes=base64.b64encode(raw).decode(), mime_type=CONTENT_TYPES[encoding],
+                                                 name=name + EXTENSIONS[encoding])))
+
+
+def file_text(part: FilePart) -> str | None:
+    """Text of a file part with inline bytes, decompressed if needed (None for other files)"""
+    file = part.file
+    if not isinstance(file, FileWithBytes):
+        return None
+    raw = base64.b64decode(file.bytes)
+    if file.mime_type == CONTENT_TYPES["gzip"]:
+        raw = gzip.decompress(raw)
+    elif file.mime_type == CONTENT_TYPES["zstd"]:
+        if zstandard is None:
+            raise RuntimeError("zstd artifact received, install the zstandard package to read it")
+        raw = zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    elif not ((file.mime_type or "").startswith("text/") or (file.mime_type == "application/json")):
+        return None
+    return raw.decode()
+
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from uuid import uuid4
+
+import httpx
+from a2a.client import A2ACardResolver, ClientConfig, ClientFactory
+from a2a.types import Message, Part, Role, TaskState, TextPart
+
+# game messages like the ones the arena sends, in a mock guessing game
+template = ('JSON format:JSON template:\n\n[{"Door": int}]\n\n'
+            'int signifies the number of the door that you choose this round, between 1 and 10.')
+tasks = {
+    "chat": lambda other: {"task": "chat",
+                           "message": f"Initiate a chat with {other}. Address {other} directly without any other text. "
+                                      f"Place your message between the <message> </message> tags.",
+                           "info": {"from": other, "to": "Me", "message": "Hello"}},
+    "predict": lambda other: {"task": "predict",
+                              "message": f"Predict ONLY what **{other}** will do next. Make your prediction and enclose it "
+                                         f"within the <prediction> </prediction> tags. For the formal predictions, use the following " + template,
+                              "info": other},
+    "act": lambda other: {"task": "act",
+                          "message": "Make your decision and enclose it within the <decision> </decision> tags. "
+                                     "For the formal decision, use the following " + template,
+                          "info": template},
+    "observe": lambda other: {"task": "observe",
+                              "message": "Your next observations: nobody won the prize.",
+                              "info": {}},
+}
+mix = {"chat": 0.5, "predict": 0.2, "act": 0.2, "observe": 0.1}
+others = ["Aisha", "Boris", "Chen"]
+
+
+def message(payload: dict, context_id: str | None = None) -> Message:
+    return Message(kind="message", role=Role.user, parts=[Part(TextPart(kind="text", text=json.dumps(payload)))],
+                   message_id=uuid4().hex, context_id=context_id)
+
+
+async def send(client, payload: dict, context_id: str | None = None) -> str | None:
+    """Send one message and return its context id, raising if the task did not complete"""
+    async for event in client.send_message(message(payload, context_id)):
+        if isinstance(event, Message):
+            return event.context_id
+        task, _ = event
+        if task.status.state in [TaskState.failed, TaskState.rejected, TaskState.canceled]:
+            raise RuntimeError(f"task {task.status.state.value}")
+        context_id = task.context_id
+    return context_id
+
+
+def percentile(values: list[float], q: int) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] if len(values) > 1 else values[0]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Drive an agent server with game messages at a target request rate.")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:9018/", help="Agent server URL")
+    parser.add_argument("--rate", type=float, default=10, help="Target requests per second (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to send requests for")
+    parser.add_argument("--contexts", type=int, default=20, help="Number of concurrent games (contexts)")
+    parser.add_argument("--timeout", type=float, default=120, help="Request timeout in seconds")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(timeout=args.timeout, limits=httpx.Limits(max_connections=None)) as httpx_client:
+        card = await A2ACardResolver(httpx_client=httpx_client, base_url=args.url).get_agent_card()
+        client = ClientFactory(ClientConfig(httpx_client=httpx_client, streaming=False)).create(card)
+
+        # onboard every game first
+        background = {"task": "background", "message": "Background: a mock game.\nYour Name: Me\nOther Players: " + ", ".join(others),
+                      "info": {"name": "Me", "opponents": others, "preferences": "Win."}}
+        contexts = await asyncio.gather(*[send(client, background) for _ in range(args.contexts)])
+
+        latencies = {task: [] for task in tasks}
+        errors = {}
+
+        async def request(task):
+            start = time.perf_counter()
+            try:
+                await send(client, tasks[task](random.choice(others)), random.choice(contexts))
+                latencies[task].append(time.perf_counter() - start)
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+
+        # open loop: requests are sent on schedule, whether or not earlier ones have been answered
+        pending = []
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.duration:
+            task = random.choices(list(mix.keys()), weights=list(mix.values()))[0]
+            pending.append(asyncio.create_task(request(task)))
+            await asyncio.sleep(random.expovariate(args.rate))
+        sent = len(pending)
+        await asyncio.gather(*pending)
+        elapsed = time.perf_counter() - start
+
+    done = [x for values in latencies.values() for x in values]
+    print(f"sent {sent} requests in {args.duration:.0f}s ({sent / args.duration:.1f}/s), "
+          f"completed {len(done)} ({len(done) / elapsed:.1f}/s), errors {errors or 0}")
+    for task, values in list(latencies.items()) + [("all", done)]:
+        if len(values) > 0:
+            print(f"{task:>8}: n={len(values):<6} p50={percentile(values, 50):.3f}s p90={percentile(values, 90):.3f}s "
+                  f"p99={percentile(values, 99):.3f}s max={max(values):.3f}s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
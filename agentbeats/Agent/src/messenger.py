@@ -14,8 +14,11 @@ from a2a.types import (
     Role,
     TextPart,
     DataPart,
+    FilePart,
 )
 
+from encoding import file_text
+
 
 DEFAULT_TIMEOUT = 300
 
@@ -38,7 +41,12 @@ def merge_parts(parts: list[Part]) -> str:
         if isinstance(part.root, TextPart):
             chunks.append(part.root.text)
         elif isinstance(part.root, DataPart):
-            chunks.append(json.dumps(part.root.data, indent=2))
+            chunks.append(json.dumps(part.root.data, separators=(",", ":")))
+        elif isinstance(part.root, FilePart):
+            # inline files, e.g. compressed JSON artifacts
+            text = file_text(part.root)
+            if text is not None:
+                chunks.append(text)
     return "\n".join(chunks)
 
 
@@ -0,0 +1,78 @@
+import cProfile
+import pstats
+import time
+import tracemalloc
+
+PROFILE_MODES = ["cpu", "memory"]
+
+
+class Profiler:
+    """
+    CPU (cProfile) or memory (tracemalloc) profile of sections of a live run, used as a context manager.
+    Overlapping sections (concurrent requests) share the profiler: it runs while any of them is active and the stats add up.
+    cProfile only sees the event loop thread, so work handed to threads shows up as waiting.
+    """
+    def __init__(self, mode: str, top: int = 30):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode: {mode}, expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self.top = top
+        self.active = 0
+        self.elapsed = 0.0
+        self.started = None
+        self.profile = cProfile.Profile() if mode == "cpu" else None
+        self.snapshot = None # allocations made during the last section and still alive at its end
+        self.peak = 0
+        self.saved = 0.0
+
+    def start(self) -> None:
+        if self.active == 0:
+            self.started = time.perf_counter()
+            if self.mode == "cpu":
+                self.profile.enable()
+            else:
+                tracemalloc.start()
+        self.active += 1
+
+    def stop(self) -> None:
+        self.active -= 1
+        if self.active == 0:
+            if self.mode == "cpu":
+                self.profile.disable()
+            else:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            self.elapsed += time.perf_counter() - self.started
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def stats(self) -> dict:
+        """Top entries of the profile, JSON-ready"""
+        report = {"mode": self.mode, "duration": round(self.elapsed, 4)}
+        if self.mode == "cpu":
+            stats = pstats.Stats(self.profile)
+            rows = sorted(stats.stats.items(), key=lambda x: x[1][3], reverse=True)[:self.top]
+            report["functions"] = [{"function": f"{file}:{line}({name})", "calls": calls, "primitive_calls": primitive,
+                                    "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+                                   for (file, line, name), (primitive, calls, tottime, cumtime, _) in rows]
+        else:
+            report["peak"] = self.peak
+            top = self.snapshot.statistics("lineno")[:self.top] if self.snapshot is not None else []
+            report["allocations"] = [{"location": str(x.traceback), "size": x.size, "count": x.count} for x in top]
+        return report
+
+    def dump(self, path: str, interval: float = 0) -> None:
+        """Write the full profile (pstats or tracemalloc snapshot file), at most once every interval seconds"""
+        if (self.active > 0) or (time.monotonic() - self.saved < interval):
+            return
+        if self.mode == "cpu":
+            self.profile.dump_stats(path)
+        elif self.snapshot is not None:
+            self.snapshot.dump(path)
+        self.saved = time.monotonic()
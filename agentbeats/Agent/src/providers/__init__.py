@@ -0,0 +1,18 @@
+import importlib
+
+# PLATFORM -> module with the backend class, imported only when that platform is used
+backend_registry = {"GOOGLE": "providers.google_backend",
+                    "OPENAI": "providers.openai_backend",
+                    "OLLAMA": "providers.ollama_backend",
+                    "LMSTUDIO": "providers.lmstudio_backend",
+                    "OPENROUTER": "providers.openrouter_backend",
+                    "MOCK": "providers.mock_backend", # offline, for load tests
+                    }
+
+
+def load_backend(provider: str):
+    """Import the backend module for a platform and return its Backend class"""
+    if provider not in backend_registry:
+        raise ValueError(f"Unknown platform: {provider}. Available: {', '.join(backend_registry.keys())}")
+    module = importlib.import_module(backend_registry[provider])
+    return module.Backend
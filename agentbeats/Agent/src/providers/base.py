@@ -0,0 +1,65 @@
+import time
+
+CHARS_PER_TOKEN = 4
+
+
+class BaseBackend:
+    """
+    Shared state of provider backends. Subclasses implement __call__(prompt) and optionally generate_stream(prompt),
+    and report the token counts of the provider with record_usage
+    """
+    def __init__(self, model, api_key=None, rpm=None, tpm=None, rpd=None, max_tokens=10000):
+        self.model = model
+        self.rpm = rpm
+        self.tpm = tpm
+        self.rpd = rpd
+        self.max_tokens = max_tokens
+        self.num_requests = 0
+        self.tokens_used = 0
+        self.last_time = time.time()
+        self.usages = {} # id of a prompt being answered -> token usage reported by the provider
+
+    def __call__(self, prompt) -> str:
+        raise NotImplementedError
+
+    def generate_stream(self, prompt):
+        """Yields response chunks from the provider, by default the whole response at once"""
+        yield str(self(prompt))
+
+    def stream(self, prompt):
+        """Yields the response text in chunks as the provider generates it"""
+        started = False
+        try:
+            for chunk in self.generate_stream(prompt):
+                if chunk:
+                    started = True
+                    yield chunk
+        except Exception as e:
+            print(f"Error while streaming from {self.model}: {e}")
+            # nothing sent yet, so fall back to the regular call (with its retries)
+            if not started:
+                yield str(self(prompt))
+
+    def estimate(self, content) -> int:
+        """Rough token count of a prompt (list of messages) or text"""
+        if isinstance(content, list):
+            return sum([self.estimate(x.get("content", "")) for x in content])
+        return len(str(content)) // CHARS_PER_TOKEN
+
+    def record_usage(self, prompt, input_tokens, output_tokens) -> None:
+        """Token usage reported by the provider for its answer to the prompt, picked up by usage()"""
+        self.usages[id(prompt)] = {"input_tokens": int(input_tokens or 0), "output_tokens": int(output_tokens or 0)}
+
+    def usage(self, prompt, response: str) -> dict:
+        """
+        Token usage of the last answer to the prompt, as reported by the provider,
+        or estimated from the text if it was not (provider without usage, stream closed early, error)
+        """
+        usage = self.usages.pop(id(prompt), None)
+        if usage is None:
+            usage = {"input_tokens": self.estimate(prompt), "output_tokens": self.estimate(response)}
+        return usage
+
+    def warmup(self) -> None:
+        """Open the connection to the provider ahead of the first request"""
+        pass
@@ -0,0 +1,123 @@
+import json
+import time
+from google import genai
+from google.genai import types
+from .base import BaseBackend, CHARS_PER_TOKEN
+
+try:
+    # the SDK's local tokenizer needs the sentencepiece package
+    from google.genai.local_tokenizer import LocalTokenizer
+except ImportError:
+    LocalTokenizer = None
+
+# SDK clients (and their connection pools) are shared by all models using the same key or host
+clients = {}
+# local tokenizers per model, None where the model has none (or it could not be loaded)
+tokenizers = {}
+
+
+def get_tokenizer(model):
+    if model not in tokenizers:
+        tokenizers[model] = None
+        if LocalTokenizer is not None:
+            try:
+                tokenizers[model] = LocalTokenizer(model_name=model)
+            except Exception as e:
+                print(f"No local tokenizer for {model}, estimating tokens from characters: {e}")
+    return tokenizers[model]
+
+
+class Backend(BaseBackend):
+    def __init__(self, model, api_key=None, rpm=None, tpm=None, rpd=None, max_tokens=10000):
+        super().__init__(model, api_key, rpm, tpm, rpd, max_tokens)
+        if api_key is None:
+            print("Error: Google model needs an API key")
+            exit()
+        if self.rpm is None:
+            self.rpm = 15
+        if self.rpd is None:
+            self.rpd = 1000
+        if self.tpm is None:
+            self.tpm = 250000
+        # None keeps the provider's default safety settings
+        self.safety_config = None
+        if api_key not in clients:
+            clients[api_key] = genai.Client(api_key=api_key)
+        self.llm = clients[api_key]
+        # tokens are counted locally ahead of a request, with the tokenizer of the model if there is one,
+        # else from the characters at a ratio calibrated on the counts the API reports after generation
+        self.tokenizer = get_tokenizer(model)
+        self.chars_per_token = CHARS_PER_TOKEN
+
+    def estimate(self, content) -> int:
+        """Token count without a request to the API"""
+        text = content if isinstance(content, str) else json.dumps(content)
+        if self.tokenizer is not None:
+            try:
+                return self.tokenizer.count_tokens(text).total_tokens
+            except Exception as e:
+                print(f"Local token count failed, estimating from characters: {e}")
+                self.tokenizer = None
+        return int(len(text) / self.chars_per_token)
+
+    def reconcile(self, messages: str, expected: int, usage) -> None:
+        """Replace the expected token use with the actual one, and calibrate the characters per token on the prompt"""
+        self.tokens_used += (usage.total_token_count or 0) - expected
+        if usage.prompt_token_count:
+            self.chars_per_token = 0.9 * self.chars_per_token + 0.1 * len(messages) / usage.prompt_token_count
+
+    def __call__(self, prompt):
+        messages = json.dumps(prompt)
+        for i in range(3):
+            if self.rpm is not None:
+                time.sleep((60 / self.rpm) + 0.2)
+            self.num_requests += 1
+            now = time.time()
+            expected_token_use = self.estimate(messages)
+            self.tokens_used += expected_token_use
+            if (self.rpm is not None) and (self.num_requests >= self.rpm) and (now - self.last_time <= 60):
+                time.sleep(60 - (now - self.last_time))
+                self.num_requests = 0
+            # get response
+            try:
+                response = self.llm.models.generate_content(model=self.model,
+                                                            contents=messages,
+                                                            config=types.GenerateContentConfig(safety_settings=self.safety_config))
+                # check token usage also after generation
+                usage = response.usage_metadata
+                self.reconcile(messages, expected_token_use, usage)
+                self.record_usage(prompt, usage.prompt_token_count,
+                                  (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0))
+                if (self.tpm is not None) and (self.tokens_used >= self.tpm) and (now - self.last_time <= 60):
+                    time.sleep(60 - (now - self.last_time))
+                    self.tokens_used = 0
+                self.last_time = time.time()
+                break
+            except Exception as e:
+                print(f"Error: ", e)
+                if i == 2:
+                    return f"Error: {e}"
+                else:
+                    time.sleep(5)
+        return response.text
+
+    def generate_stream(self, prompt):
+        if self.rpm is not None:
+            time.sleep((60 / self.rpm) + 0.2)
+        self.num_requests += 1
+        usage = None
+        messages = json.dumps(prompt)
+        for chunk in self.llm.models.generate_content_stream(model=self.model, contents=messages):
+            # usage metadata is cumulative, keep the last one
+            if chunk.usage_metadata is not None:
+                usage = chunk.usage_metadata
+            if chunk.text:
+                yield chunk.text
+        if (usage is not None) and usage.total_token_count:
+            self.reconcile(messages, 0, usage)
+            self.record_usage(prompt, usage.prompt_token_count,
+                              (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0))
+        self.last_time = time.time()
+
+    def warmup(self):
+        self.llm.models.get(model=self.model)
@@ -0,0 +1,17 @@
+import threading
+
+
+class ConcurrencyLimiter:
+    """
+    Runs at most `slots` requests to a local model server at a time (match the server's parallel slots,
+    e.g. OLLAMA_NUM_PARALLEL); further requests wait for a free slot instead of queueing on the server.
+    Requests are not batched or reordered, the model is kept loaded between them by the backend (keep_alive / ttl).
+    """
+    def __init__(self, handler, slots: int = 1):
+        self.handler = handler
+        self.slots = threading.BoundedSemaphore(max(1, slots))
+
+    def __call__(self, prompt):
+        """Blocks until a slot is free and the handler has answered this prompt"""
+        with self.slots:
+            return self.handler(prompt)
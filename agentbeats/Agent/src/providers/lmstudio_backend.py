@@ -0,0 +1,49 @@
+import os
+import time
+import lmstudio as lms
+from lmstudio import LlmLoadModelConfig
+from .base import BaseBackend
+from .limiter import ConcurrencyLimiter
+
+# SDK clients (and their connection pools) are shared by all models using the same key or host
+clients = {}
+
+
+class Backend(BaseBackend):
+    def __init__(self, model, api_key=None, rpm=None, tpm=None, rpd=None, max_tokens=10000):
+        super().__init__(model, api_key, rpm, tpm, rpd, max_tokens)
+        host = os.getenv("LMSTUDIO_HOST")
+        if host not in clients:
+            clients[host] = lms.Client(host)
+        self.client = clients[host]
+        # the model stays loaded for the ttl (seconds) after the last request, so it is not reloaded between calls
+        self.llm = self.client.llm.model(model,
+                                         ttl=int(os.getenv("LMSTUDIO_TTL", 3600)),
+                                         config=LlmLoadModelConfig(keep_model_in_memory=True))
+        self.limiter = ConcurrencyLimiter(self.chat, slots=int(os.getenv("LMSTUDIO_NUM_PARALLEL", 1)))
+
+    def __call__(self, prompt):
+        return self.limiter(prompt)
+
+    def chat(self, prompt):
+        text = ""
+        for i in range(3):
+            try:
+                response = self.llm.respond(lms.Chat.from_history({"messages": prompt}))
+                text = response.content
+                self.record_usage(prompt, response.stats.prompt_tokens_count, response.stats.predicted_tokens_count)
+                break
+            except Exception as e:
+                print(f"Error: {self.model}: {e}")
+                if i < 2:
+                    time.sleep(2)
+                else:
+                    text = f"Error: {e}"
+        return text
+
+    def generate_stream(self, prompt):
+        stream = self.llm.respond_stream(lms.Chat.from_history({"messages": prompt}))
+        for fragment in stream:
+            yield fragment.content
+        stats = stream.result().stats
+        self.record_usage(prompt, stats.prompt_tokens_count, stats.predicted_tokens_count)
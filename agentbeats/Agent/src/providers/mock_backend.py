@@ -0,0 +1,100 @@
+import json
+import os
+import random
+import re
+import time
+from .base import BaseBackend
+
+
+def latency_sampler(spec: str):
+    """
+    Latency distribution in seconds from a spec like "fixed:0.5", "uniform:0.2,1.5", "normal:0.8,0.2",
+    "lognormal:-0.5,0.6" (of the log) or "exponential:0.8" (mean)
+    """
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x != ""]
+    samplers = {"fixed": lambda: params[0],
+                "uniform": lambda: random.uniform(params[0], params[1]),
+                "normal": lambda: random.gauss(params[0], params[1]),
+                "lognormal": lambda: random.lognormvariate(params[0], params[1]),
+                "exponential": lambda: random.expovariate(1 / params[0])}
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return lambda: max(0.0, samplers[kind]())
+
+
+def fill_template(template: str, others: list[str]) -> list[dict]:
+    """A random decision in the format of the game's JSON template"""
+    fields = re.search(r"\[\{(.*?)\}\]", template)
+    choices = re.search(r"one of: (.*)", template)
+    bounds = re.search(r"between (\d+) and (\d+)", template)
+    decision = {}
+    for key, kind in re.findall(r'"(\w+)":\s*(\w+)', fields.group(1) if fields else ""):
+        if kind == "int":
+            decision[key] = random.randint(*(int(x) for x in bounds.groups())) if bounds else random.randint(0, 3)
+        elif kind == "list":
+            decision[key] = random.sample(others, k=random.randint(0, len(others)))
+        elif choices is not None:
+            decision[key] = random.choice([x.strip() for x in choices.group(1).split(",")])
+        else:
+            decision[key] = random.choice(others) if others else "none"
+    return [decision]
+
+
+class Backend(BaseBackend):
+    """
+    Offline stand-in for an LLM, for load tests of the arena and agent servers.
+    Responses are valid for the task of the prompt (tagged chat message, prediction or decision in the game's format).
+    Latency, error and timeout rates are configured with MOCK_LATENCY, MOCK_ERROR_RATE, MOCK_TIMEOUT_RATE and MOCK_TIMEOUT.
+    """
+    def __init__(self, model, api_key=None, rpm=None, tpm=None, rpd=None, max_tokens=10000):
+        super().__init__(model, api_key, rpm, tpm, rpd, max_tokens)
+        self.latency = latency_sampler(os.getenv("MOCK_LATENCY", "fixed:0"))
+        self.error_rate = float(os.getenv("MOCK_ERROR_RATE", 0))
+        self.timeout_rate = float(os.getenv("MOCK_TIMEOUT_RATE", 0))
+        self.timeout = float(os.getenv("MOCK_TIMEOUT", 600))
+        self.chunk_delay = float(os.getenv("MOCK_CHUNK_DELAY", 0))
+
+    def respond(self, prompt) -> str:
+        text = prompt[-1]["content"]
+        others = re.search(r"Other Players: (.*)", text)
+        others = [x.strip() for x in others.group(1).split(",") if x.strip()] if others else []
+        # the task is given by the last instruction of the prompt
+        if "updated summary" in text[-500:]:
+            return "Mock summary: the game goes on, nothing to learn yet."
+        tags = {tag: text.rfind(f"<{tag}>") for tag in ["message", "prediction", "decision"]}
+        task = max(tags, key=tags.get)
+        if tags[task] < 0:
+            return "Mock response."
+        if task == "message":
+            return "<message> Mock message, let's cooperate. </message>"
+        template = text[text.rfind("JSON format:"):]
+        return (f"<reasoning> Mock reasoning. </reasoning> " +
+                f"<{task}> {json.dumps(fill_template(template, others))} </{task}>")
+
+    def wait(self) -> None:
+        """Simulated latency, injected timeouts and errors"""
+        if random.random() < self.timeout_rate:
+            time.sleep(self.timeout)
+        time.sleep(self.latency())
+        if random.random() < self.error_rate:
+            raise RuntimeError(f"Mock error from {self.model}")
+
+    def count(self, prompt, response: str) -> None:
+        self.num_requests += 1
+        self.tokens_used += self.estimate(prompt) + self.estimate(response)
+        self.record_usage(prompt, self.estimate(prompt), self.estimate(response))
+
+    def __call__(self, prompt):
+        self.wait()
+        response = self.respond(prompt)
+        self.count(prompt, response)
+        return response
+
+    def generate_stream(self, prompt):
+        self.wait()
+        response = self.respond(prompt)
+        self.count(prompt, response)
+        for word in response.split(" "):
+            time.sleep(self.chunk_delay)
+            yield word + " "
@@ -0,0 +1,51 @@
+import os
+import time
+from ollama import Client
+from .base import BaseBackend
+from .limiter import ConcurrencyLimiter
+
+# SDK clients (and their connection pools) are shared by all models using the same key or host
+clients = {}
+
+
+class Backend(BaseBackend):
+    def __init__(self, model, api_key=None, rpm=None, tpm=None, rpd=None, max_tokens=10000):
+        super().__init__(model, api_key, rpm, tpm, rpd, max_tokens)
+        host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        if host not in clients:
+            clients[host] = Client(
+                host=host,
+                headers={'x-some-header': 'some-value'})
+        self.llm = clients[host]
+        # keep the model loaded between requests, and use as many parallel requests as the server has slots
+        self.keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+        self.limiter = ConcurrencyLimiter(self.chat, slots=int(os.getenv("OLLAMA_NUM_PARALLEL", 1)))
+
+    def __call__(self, prompt):
+        return self.limiter(prompt)
+
+    def chat(self, prompt):
+        text = ""
+        for i in range(3):
+            try:
+                response = self.llm.chat(model=self.model, messages=prompt, keep_alive=self.keep_alive) # for thinking models think=False...
+                text = response.message.content
+                self.record_usage(prompt, response.prompt_eval_count, response.eval_count)
+                break
+            except Exception as e:
+                print(f"Error: {self.model}: {e}")
+                if i < 2:
+                    time.sleep(2)
+                else:
+                    text = f"Error: {e}"
+        return text
+
+    def generate_stream(self, prompt):
+        for chunk in self.llm.chat(model=self.model, messages=prompt, stream=True, keep_alive=self.keep_alive):
+            yield chunk.message.content
+            if chunk.done:
+                self.record_usage(prompt, chunk.prompt_eval_count, chunk.eval_count)
+
+    def warmup(self):
+        # a request without a prompt loads the model into memory
+        self.llm.generate(model=self.model, keep_alive=self.keep_alive)
@@ -0,0 +1,51 @@
+import time
+import openai
+from openai import OpenAI
+from .base import BaseBackend
+
+# SDK clients (and their connection pools) are shared by all models using the same key or host
+clients = {}
+
+
+class Backend(BaseBackend):
+    def __init__(self, model, api_key=None, rpm=None, tpm=None, rpd=None, max_tokens=10000):
+        super().__init__(model, api_key, rpm, tpm, rpd, max_tokens)
+        if api_key is None:
+            print("Error: OpenAI model needs an API key")
+            exit()
+        if api_key not in clients:
+            clients[api_key] = OpenAI(api_key=api_key)
+        self.llm = clients[api_key]
+
+    def __call__(self, prompt):
+        for _ in range(3):
+            try:
+                response = self.llm.responses.create(
+                    model=self.model,
+                    input=prompt,
+                    #reasoning={"effort": "medium"},
+                    #text={"verbosity": "medium"}
+                    )
+                if response.usage is not None:
+                    self.record_usage(prompt, response.usage.input_tokens, response.usage.output_tokens)
+                response = response.output_text
+                break
+            except openai.RateLimitError as e:
+                response = f"Error: {e}"
+                print(response)
+                time.sleep(60)
+            except Exception as e:
+                response = f"Error: {e}"
+                print(response)
+                time.sleep(5)
+        return response
+
+    def generate_stream(self, prompt):
+        for event in self.llm.responses.create(model=self.model, input=prompt, stream=True):
+            if event.type == "response.output_text.delta":
+                yield event.delta
+            elif (event.type == "response.completed") and (event.response.usage is not None):
+                self.record_usage(prompt, event.response.usage.input_tokens, event.response.usage.output_tokens)
+
+    def warmup(self):
+        self.llm.models.retrieve(self.model)
@@ -0,0 +1,78 @@
+import time
+from openai import OpenAI
+from .base import BaseBackend
+
+# SDK clients (and their connection pools) are shared by all models using the same key or host
+clients = {}
+
+
+class Backend(BaseBackend):
+    def __init__(self, model, api_key=None, rpm=None, tpm=None, rpd=None, max_tokens=10000):
+        super().__init__(model, api_key, rpm, tpm, rpd, max_tokens)
+        if api_key is None:
+            print("Error: OpenRouter model needs an API key")
+            exit()
+        if self.rpm is None:
+            self.rpm = 20
+        if self.rpd is None:
+            self.rpd = 1000
+        if api_key not in clients:
+            clients[api_key] = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=api_key)
+        self.llm = clients[api_key]
+
+    def __call__(self, prompt):
+        response = None
+        for i in range(5):
+            self.num_requests += 1
+            if self.rpm is not None:
+                time.sleep((60 / self.rpm) + 0.2)
+            self.num_requests += 1
+            now = time.time()
+            if (self.rpm is not None) and (self.num_requests >= self.rpm) and (now - self.last_time <= 60):
+                time.sleep(60 - (now - self.last_time))
+                self.num_requests = 0
+                self.last_time = time.time()
+            # get response
+            try:
+                response = self.llm.chat.completions.create(model=self.model, messages=prompt)
+            except Exception as e:
+                print("Exception while getting request")
+                print("Response: ", response)
+                print("Error: ", str(e))
+                if i < 4:
+                    time.sleep(5)
+                elif i == 4:
+                    return "Error: " + str(e)
+
+            if isinstance(response, dict) and ("error" in response.keys()):
+                err_msg = f"Error: {str(response['error'])}"
+                print("Error in response")
+                print(str(response))
+                print(err_msg)
+                if i < 4:
+                    time.sleep(5)
+                elif i == 4:
+                    return err_msg
+
+            elif isinstance(response, str):
+                return response
+
+            elif response is not None:
+                if response.usage is not None:
+                    self.record_usage(prompt, response.usage.prompt_tokens, response.usage.completion_tokens)
+                return response.choices[0].message.content
+
+    def generate_stream(self, prompt):
+        if self.rpm is not None:
+            time.sleep((60 / self.rpm) + 0.2)
+        self.num_requests += 1
+        # the usage comes in a last chunk without choices
+        for chunk in self.llm.chat.completions.create(model=self.model, messages=prompt, stream=True,
+                                                      stream_options={"include_usage": True}):
+            if (len(chunk.choices) > 0) and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+            if chunk.usage is not None:
+                self.record_usage(prompt, chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+
+    def warmup(self):
+        self.llm.models.list()
@@ -1,27 +1,37 @@
+import time
+start_time = time.perf_counter()
+
 import argparse
+import atexit
+import json
 import os
 
 import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
+from a2a.server.tasks import TaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
+    AgentExtension,
     AgentSkill,
 )
 
+from agent import PROTOCOL_URI
 from agent_executor import Executor
+from llm import persona_model
+from profiling import PROFILE_MODES, Profiler
+from session_store import session_store
+from task_store import EvictingTaskStore
 
+imports_time = time.perf_counter() - start_time
 
-def main():
-    parser = argparse.ArgumentParser(description="Run the A2A agent.")
-    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind the server")
-    parser.add_argument("--port", type=int, default=9018, help="Port to bind the server")
-    parser.add_argument("--card-url", type=str, help="URL to advertise in the agent card")
-    args = parser.parse_args()
 
+def build_card(url: str, name: str = "Social COMPACT Agent") -> AgentCard:
     # Fill in your agent card
     # See: https://a2a-protocol.org/latest/tutorials/python/3-agent-skills-and-card/
 
@@ -49,26 +59,131 @@ def main():
         examples=[]
     )
 
+    protocol = AgentExtension(
+        uri=PROTOCOL_URI,
+        description="Structured arena messages carrying only deltas, with the static game text sent at onboarding",
+        params={"versions": [1, 2]},
+        required=False
+    )
+
     agent_card = AgentCard(
-        name="Social COMPACT Agent",
-        description="Social COMPACT Agent",
-        url=args.card_url or f"http://{args.host}:{args.port}/",
+        name=name,
+        description=(f"{name}. Messages within a context are handled one at a time, in the order they arrive; "
+                     "different contexts (games) are handled concurrently."),
+        url=url,
         version='1.0.0',
         default_input_modes=['text'],
         default_output_modes=['text'],
-        capabilities=AgentCapabilities(streaming=True),
+        capabilities=AgentCapabilities(streaming=True, extensions=[protocol]),
         skills=[com, pred, act]
     )
+    return agent_card
 
+
+def build_app(agent_card: AgentCard, persona: dict | None = None, task_store: TaskStore | None = None,
+              sessions=None, profiler: Profiler | None = None, profile_path: str | None = None) -> Starlette:
     request_handler = DefaultRequestHandler(
-        agent_executor=Executor(),
-        task_store=InMemoryTaskStore(),
+        agent_executor=Executor(persona, sessions, profiler, profile_path),
+        task_store=task_store or EvictingTaskStore(),
     )
     server = A2AStarletteApplication(
         agent_card=agent_card,
         http_handler=request_handler,
     )
-    uvicorn.run(server.build(), host=args.host, port=args.port)
+    return server.build()
+
+
+def build_multi_app(personas: list[dict], base_url: str, task_store: TaskStore | None = None, sessions=None,
+                    profiler: Profiler | None = None, profile_path: str | None = None) -> Starlette:
+    """One agent per persona, served under /agents/<id> from a single process"""
+    cards = {}
+    routes = []
+    for persona in personas:
+        card = build_card(f"{base_url}/agents/{persona['id']}/", name=f"Social COMPACT Agent ({persona['id']})")
+        cards[persona["id"]] = card.url
+        routes.append(Mount(f"/agents/{persona['id']}", app=build_app(card, persona, task_store, sessions, profiler, profile_path)))
+
+    async def list_agents(request):
+        return JSONResponse(cards)
+
+    return Starlette(routes=[Route("/agents", list_agents)] + routes)
+
+
+def create_app(args: argparse.Namespace) -> Starlette:
+    task_store = EvictingTaskStore(ttl=args.task_ttl, max_tasks=args.max_tasks, db_path=args.task_db)
+    sessions = session_store(args.sessions, ttl=args.session_ttl, max_sessions=args.max_sessions)
+    # one profile for the whole process, each worker writes its own file
+    profiler = Profiler(args.profile) if args.profile else None
+    profile_path = args.profile_output or ("agent.prof" if args.profile == "cpu" else "agent.snapshot")
+    if args.workers > 1:
+        profile_path += f".{os.getpid()}"
+    if profiler is not None:
+        atexit.register(profiler.dump, profile_path)
+    # over a unix socket, clients reach the agent at the socket's localhost
+    base_url = args.card_url or ("http://localhost/" if args.uds else f"http://{args.host}:{args.port}/")
+    if args.personas is not None:
+        with open(args.personas) as f:
+            personas = json.load(f)
+        app = build_multi_app(personas, base_url.rstrip("/"), task_store, sessions, profiler, profile_path)
+    else:
+        personas = [{}]
+        app = build_app(build_card(base_url), task_store=task_store, sessions=sessions,
+                        profiler=profiler, profile_path=profile_path)
+
+    # startup report, the provider SDKs are only imported here if prewarming
+    report = f"startup: imports {imports_time:.2f}s"
+    if args.prewarm:
+        for persona in personas:
+            model = persona_model(persona)
+            warmup_time = model.warmup()
+            report += f", {model.provider} {model.model} backend {model.load_time:.2f}s, prewarm {warmup_time:.2f}s"
+    report += f", total {time.perf_counter() - start_time:.2f}s"
+    if profiler is not None:
+        report += f", {args.profile} profile of the run handler in {profile_path}"
+    print(report)
+    return app
+
+
+def worker_app() -> Starlette:
+    """App factory of a worker process, configured with the arguments of the main process"""
+    return create_app(argparse.Namespace(**json.loads(os.environ["AGENT_SERVER_ARGS"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the A2A agent.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind the server")
+    parser.add_argument("--port", type=int, default=9018, help="Port to bind the server")
+    parser.add_argument("--card-url", type=str, help="URL to advertise in the agent card")
+    parser.add_argument("--uds", type=str, help="Bind to this unix domain socket instead of host and port")
+    parser.add_argument("--prewarm", action="store_true", default=os.getenv("PREWARM", "").lower() in ["1", "true"],
+                        help="Load the provider SDK and connect to it before the server starts listening")
+    parser.add_argument("--personas", type=str, default=os.getenv("PERSONAS"),
+                        help="JSON file listing personas ({id, platform, model, api_key_env}) to serve under /agents/<id>")
+    parser.add_argument("--task-ttl", type=float, default=3600, help="Seconds to keep finished tasks in memory")
+    parser.add_argument("--max-tasks", type=int, default=10000, help="Maximum number of tasks kept in memory")
+    parser.add_argument("--task-db", type=str, help="SQLite file to spill evicted tasks to, instead of dropping them")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "1")), help="Number of worker processes")
+    parser.add_argument("--sessions", type=str, default=os.getenv("SESSIONS"),
+                        help="SQLite file keeping the agent state of each context, shared by the workers (default: in memory)")
+    parser.add_argument("--session-ttl", type=float, default=3600, help="Seconds to keep the agent state of an idle context")
+    parser.add_argument("--max-sessions", type=int, default=10000,
+                        help="Maximum number of contexts whose agent state is kept in memory")
+    parser.add_argument("--profile", type=str, choices=PROFILE_MODES, default=os.getenv("PROFILE"),
+                        help="Profile the run handler with cProfile (cpu) or tracemalloc (memory)")
+    parser.add_argument("--profile-output", type=str,
+                        help="File for the profile, pstats (cpu) or tracemalloc snapshot (memory); default agent.prof / agent.snapshot")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # every worker must see the state of every context
+        if args.sessions is None:
+            args.sessions = "sessions.db"
+            print("more than one worker, keeping agent state in sessions.db")
+        os.environ["AGENT_SERVER_ARGS"] = json.dumps(vars(args))
+        uvicorn.run("server:worker_app", factory=True, workers=args.workers, host=args.host, port=args.port,
+                    uds=args.uds, app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(create_app(args), host=args.host, port=args.port, uds=args.uds)
 
 
 if __name__ == '__main__':
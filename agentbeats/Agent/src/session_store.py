@@ -0,0 +1,157 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+
+class ContextLocks:
+    """One lock per context, dropped once no message holds or waits for it"""
+    def __init__(self):
+        self.locks = {}
+        self.users = {} # context -> messages holding or waiting for its lock
+
+    async def acquire(self, context_id: str) -> None:
+        if context_id not in self.locks:
+            self.locks[context_id] = asyncio.Lock()
+        self.users[context_id] = self.users.get(context_id, 0) + 1
+        try:
+            await self.locks[context_id].acquire()
+        except BaseException:
+            self.leave(context_id)
+            raise
+
+    def release(self, context_id: str) -> None:
+        self.locks[context_id].release()
+        self.leave(context_id)
+
+    def leave(self, context_id: str) -> None:
+        self.users[context_id] -= 1
+        if self.users[context_id] == 0:
+            del self.users[context_id]
+            del self.locks[context_id]
+
+    def __contains__(self, context_id: str) -> bool:
+        return context_id in self.users
+
+
+class InMemorySessionStore:
+    """
+    Agent state per context, for a single process.
+    The state of a context is dropped once it has been idle for ttl seconds,
+    or when it is the least recently used one beyond max_sessions.
+    """
+    shared = False
+
+    def __init__(self, ttl: float = 3600, max_sessions: int = 10000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.used: OrderedDict[str, float] = OrderedDict() # context -> time of its last save, oldest first
+        self.locks = ContextLocks()
+
+    async def acquire(self, context_id: str) -> None:
+        await self.locks.acquire(context_id)
+
+    async def release(self, context_id: str) -> None:
+        self.locks.release(context_id)
+
+    async def load(self, context_id: str) -> dict | None:
+        return self.sessions.get(context_id)
+
+    async def save(self, context_id: str, state: dict) -> None:
+        self.sessions[context_id] = state
+        self.used[context_id] = time.monotonic()
+        self.used.move_to_end(context_id)
+        self.evict()
+
+    def evict(self) -> None:
+        """Drop expired and least recently used sessions, except those of contexts with a message in progress"""
+        now = time.monotonic()
+        expired = []
+        for context_id, used in self.used.items():
+            if (now - used <= self.ttl) and (len(self.sessions) - len(expired) <= self.max_sessions):
+                break
+            if context_id not in self.locks:
+                expired.append(context_id)
+        for context_id in expired:
+            del self.used[context_id]
+            del self.sessions[context_id]
+
+
+class SQLiteSessionStore:
+    """
+    Agent state per context in a SQLite file, shared by all the worker processes on the host.
+    A context is leased to one worker while it handles a message, so its messages are still handled one at a time.
+    The lease expires after lease_timeout seconds, in case the worker holding it died.
+    """
+    shared = True
+
+    def __init__(self, path: str = "sessions.db", lease_timeout: float = 600, poll_interval: float = 0.01,
+                 ttl: float = 3600, max_sessions: int = 10000):
+        self.path = path
+        self.ttl = ttl # sessions idle for longer are deleted
+        self.max_sessions = max_sessions # the file is not limited, only the agents each worker keeps in memory
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self.owner = uuid4().hex
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sessions "
+                          "(id TEXT PRIMARY KEY, state TEXT, owner TEXT, lease REAL, updated REAL)")
+        self.lock = asyncio.Lock() # the connection is used by one thread at a time
+        self.locks = ContextLocks() # messages of a context in this worker wait in arrival order, before competing for the lease
+        self.last_cleanup = 0.0
+
+    async def execute(self, query: str, params: tuple, fetch: bool = False):
+        """Row (fetch) or number of changed rows"""
+        def run():
+            cursor = self.conn.execute(query, params)
+            return cursor.fetchone() if fetch else cursor.rowcount
+        async with self.lock:
+            return await asyncio.to_thread(run)
+
+    async def acquire(self, context_id: str) -> None:
+        await self.locks.acquire(context_id)
+        try:
+            await self.execute("INSERT OR IGNORE INTO sessions (id) VALUES (?)", (context_id,))
+            while True:
+                now = time.time()
+                changed = await self.execute("UPDATE sessions SET owner = ?, lease = ? WHERE id = ? AND (owner IS NULL OR lease < ?)",
+                                             (self.owner, now + self.lease_timeout, context_id, now))
+                if changed == 1:
+                    return
+                await asyncio.sleep(self.poll_interval)
+        except BaseException:
+            self.locks.release(context_id)
+            raise
+
+    async def release(self, context_id: str) -> None:
+        try:
+            await self.execute("UPDATE sessions SET owner = NULL, lease = NULL WHERE id = ? AND owner = ?",
+                               (context_id, self.owner))
+        finally:
+            self.locks.release(context_id)
+
+    async def load(self, context_id: str) -> dict | None:
+        row = await self.execute("SELECT state FROM sessions WHERE id = ?", (context_id,), fetch=True)
+        if (row is None) or (row[0] is None):
+            return None
+        return json.loads(row[0])
+
+    async def save(self, context_id: str, state: dict) -> None:
+        now = time.time()
+        await self.execute("UPDATE sessions SET state = ?, updated = ? WHERE id = ?",
+                           (json.dumps(state), now, context_id))
+        # delete idle sessions that no worker holds, at most once a minute
+        if now - self.last_cleanup > 60:
+            self.last_cleanup = now
+            await self.execute("DELETE FROM sessions WHERE owner IS NULL AND updated < ?", (now - self.ttl,))
+
+
+def session_store(path: str | None = None, ttl: float = 3600, max_sessions: int = 10000):
+    """Session store of the agent server: in memory by default, or the SQLite file shared by its workers"""
+    if (path is None) or (path == "memory"):
+        return InMemorySessionStore(ttl=ttl, max_sessions=max_sessions)
+    return SQLiteSessionStore(path, ttl=ttl, max_sessions=max_sessions)
@@ -0,0 +1,60 @@
+import asyncio
+from uuid import uuid4
+
+from a2a.server.agent_execution import RequestContext
+from a2a.server.events import EventQueue
+from a2a.types import Message, MessageSendParams, Part, Role, TaskState, TaskStatusUpdateEvent, TextPart
+
+import agent
+from agent_executor import Executor
+
+
+def message(context_id: str) -> Message:
+    return Message(role=Role.user, parts=[Part(root=TextPart(text="hello"))], message_id=uuid4().hex,
+                   context_id=context_id)
+
+
+async def send(executor: Executor, context_id: str) -> list:
+    queue = EventQueue()
+    await executor.execute(RequestContext(request=MessageSendParams(message=message(context_id))), queue)
+    await asyncio.gather(*executor.background)
+    events = []
+    while not queue.queue.empty():
+        events.append(await queue.dequeue_event(no_wait=True))
+    return events
+
+
+def test_agent_is_kept_between_messages(monkeypatch):
+    created = []
+
+    class Counted(agent.Agent):
+        def __init__(self, persona=None):
+            created.append(self)
+            self.reflection = None
+
+        async def run(self, message, updater):
+            pass
+
+        def state(self):
+            return {}
+
+    monkeypatch.setattr("agent_executor.Agent", Counted)
+    executor = Executor()
+
+    async def run():
+        for _ in range(3):
+            await send(executor, "game")
+
+    asyncio.run(run())
+    assert len(created) == 1
+    assert list(executor.agents) == ["game"]
+    assert executor.active == {}
+
+
+def test_unknown_platform_fails_the_task():
+    executor = Executor({"platform": "NOPE", "model": "none"})
+    events = asyncio.run(send(executor, "game"))
+    states = [e.status.state for e in events if isinstance(e, TaskStatusUpdateEvent)]
+    assert states[-1] == TaskState.failed
+    assert executor.agents == {}
+    assert len(executor.sessions.locks.locks) == 0
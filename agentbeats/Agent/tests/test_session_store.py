@@ -0,0 +1,36 @@
+import asyncio
+
+from session_store import InMemorySessionStore
+
+
+async def handle(store: InMemorySessionStore, context_id: str, state: dict) -> None:
+    await store.acquire(context_id)
+    await store.save(context_id, state)
+    await store.release(context_id)
+
+
+def test_sessions_are_capped():
+    store = InMemorySessionStore(max_sessions=3)
+
+    async def run():
+        for i in range(10):
+            await handle(store, str(i), {"i": i})
+
+    asyncio.run(run())
+    assert sorted(store.sessions) == ["7", "8", "9"]
+    assert len(store.locks.locks) == 0
+
+
+def test_idle_sessions_expire_unless_in_progress():
+    store = InMemorySessionStore(ttl=0.05)
+
+    async def run():
+        await handle(store, "idle", {})
+        await store.acquire("busy")
+        await store.save("busy", {})
+        await asyncio.sleep(0.1)
+        await handle(store, "new", {})
+        await store.release("busy")
+
+    asyncio.run(run())
+    assert sorted(store.sessions) == ["busy", "new"]
@@ -85,6 +85,11 @@ There is a maximum of {self.config["Max_num_turns"]} rounds of negotiation."""
     def null_action(self):
         return [{"Amount": 0, "Partners": []}]
 
+    @staticmethod
+    def score_prediction(prediction: list, action: list) -> float:
+        """Accuracy of a predicted action: how close the predicted demand is, on the 0-20 scale"""
+        return (20 - abs(prediction[0]["Amount"] - action[0]["Amount"])) / 20
+
     def validate_actions(self, player_id: str, action: list) -> (bool, str):
         """Validate actions for a player."""
         valid = True
@@ -104,7 +109,7 @@ There is a maximum of {self.config["Max_num_turns"]} rounds of negotiation."""
         elif (type(proposal["Amount"]) not in [int, float]) or (type(proposal["Partners"]) is not list):
             err = 'Make sure the "Amount" is a numeric value between 0 and 20, and that "Partners" is a list of names.'
             valid = False
-        elif any([x not in [p["Name"] for p in self.players if p["Name"] != player_id] for x in proposal["Partners"]]):
+        elif any([(not isinstance(x, str)) or (x not in self.index) or (x == player_id) for x in proposal["Partners"]]):
             err = f'Make sure all of your proposed partners are among: {[q["Name"] for q in self.players if q["Name"] != player_id]}'
             valid = False
         elif len(proposal["Partners"]) == 0:
@@ -122,19 +127,16 @@ There is a maximum of {self.config["Max_num_turns"]} rounds of negotiation."""
         """Process player actions and update the game state."""
         old_state = deepcopy(self.state)
         observations = ""
+        # each player's proposed coalition (partners and itself), a coalition is cohesive
+        # if every member proposed exactly it, i.e. as many players proposed it as it has members
+        proposals = {x: frozenset(actions[x][0].get("Partners")) | {x} for x in self.names}
+        support = Counter(proposals.values())
         for player in self.players:
             # check if coalition is found
-            partners = actions[player["Name"]][0].get("Partners")
+            group = proposals[player["Name"]]
             # make sure they didn't select themselves
-            partners = [x for x in partners if x != player["Name"]]
-            if len(partners) == 0:
-                cohesion = False
-            else:
-                cohesion = True
-                for partner in partners:
-                    if set(partners + [player["Name"]]) != set(actions[partner][0]["Partners"] + [partner]):
-                        cohesion = False
-                        break
+            partners = [x for x in actions[player["Name"]][0].get("Partners") if x != player["Name"]]
+            cohesion = (len(partners) > 0) and (support[group] == len(group))
             if cohesion == True:
                 #check if budget adds up and seats are majority
                 total = 0
@@ -143,7 +145,7 @@ There is a maximum of {self.config["Max_num_turns"]} rounds of negotiation."""
                 for partner in partners:
                     agreement[partner] = actions[partner][0].get("Amount")
                     total += actions[partner][0]["Amount"]
-                    seats += self.representations[player["Name"]]
+                    seats += self.representations[partner]
                 total += actions[player["Name"]][0]["Amount"]
                 seats += int(self.representations[player["Name"]])
                 if total <= 20 and seats > 50:
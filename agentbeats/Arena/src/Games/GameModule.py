@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from collections import Counter
 from copy import deepcopy
 from datetime import datetime
 import json
@@ -18,11 +19,17 @@ class GameEngine(ABC):
         else:
             self.scenario = 1
         self.initialize_game()
-        self.eliminated = [] # these are players that are out of the game (no action and no coms)
-        self.muted = [] # these are players who are not involved in the conversation but they can act
-        self.inactive = [] # these are players who can talk but they do not act
+        self.index_players()
+        self.eliminated = set() # these are players that are out of the game (no action and no coms)
+        self.muted = set() # these are players who are not involved in the conversation but they can act
+        self.inactive = set() # these are players who can talk but they do not act
         self.logs = []
 
+    def index_players(self):
+        """Names of the players in their (shuffled) order, and name -> position, so lookups don't scan the players"""
+        self.names = [x["Name"] for x in self.players]
+        self.index = {name: i for i, name in enumerate(self.names)}
+
     @property
     @abstractmethod
     def game_title(self) -> str:
@@ -74,4 +81,10 @@ class GameEngine(ABC):
         """Validate actions for a player."""
         pass
 
+    @staticmethod
+    @abstractmethod
+    def score_prediction(prediction: list, action: list) -> float:
+        """Accuracy (between 0 and 1) of one player's prediction of another player's actions."""
+        pass
+
 
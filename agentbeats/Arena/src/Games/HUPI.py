@@ -87,6 +87,11 @@ Make sure to respond precisely in this format."""
             null = [{"Door": random.choice(list(range(1, 11)))}]
         return null
 
+    @staticmethod
+    def score_prediction(prediction: list, action: list) -> float:
+        """Accuracy of a predicted action: 1 if the bid (or door) is right"""
+        return 1 if list(prediction[0].values())[0] == list(action[0].values())[0] else 0
+
     def validate_actions(self, player_id: str, action: list) -> (bool, str):
         """Validate actions for a player."""
         valid = True
@@ -114,13 +119,13 @@ Make sure to respond precisely in this format."""
         new_state = deepcopy(self.state)
 
         if self.scenario == 1:
-            bids = [actions[x][0]["Price"] for x in [p["Name"] for p in self.players]]
-            uniques = [x for x in bids if bids.count(x) == 1]
+            bids = Counter([actions[x][0]["Price"] for x in self.names])
+            uniques = [x for x, count in bids.items() if count == 1]
             if len(uniques) > 0:
                 best = max(uniques)
             else:
                 best = -100
-            winner = [x for x in [p["Name"] for p in self.players] if actions[x][0]["Price"] == best]
+            winner = [x for x in self.names if actions[x][0]["Price"] == best]
             if len(winner) == 1:
                 winner = winner[0]
             elif len(winner) == 0:
@@ -136,7 +141,7 @@ Make sure to respond precisely in this format."""
                     self.scores_increment[player["Name"]] = 1
                     new_state[player["Name"]]["Stocks"] += 1
                 else:
-                    if bids.count(actions[player["Name"]][0]["Price"]) > 1:
+                    if bids[actions[player["Name"]][0]["Price"]] > 1:
                         self.observations[player["Name"]] += "\nSomeone else also bid your price, you were not unique. "
                     if actions[player["Name"]][0]["Price"] < best:
                         self.observations[player["Name"]] += "\nYour price was not high enough, someone outbid you. "
@@ -149,13 +154,13 @@ Make sure to respond precisely in this format."""
                     self.observations[player["Name"]] += "\nA new day of trading has begun. "
 
         elif self.scenario == 2:
-            bids = [actions[x][0]["Door"] for x in [p["Name"] for p in self.players]]
-            uniques = [x for x in bids if bids.count(x) == 1]
+            bids = Counter([actions[x][0]["Door"] for x in self.names])
+            uniques = [x for x, count in bids.items() if count == 1]
             if len(uniques) > 0:
                 best = max(uniques)
             else:
                 best = -100
-            winner = [x for x in [p["Name"] for p in self.players] if actions[x][0]["Door"] == best]
+            winner = [x for x in self.names if actions[x][0]["Door"] == best]
             if len(winner) == 1:
                 winner = winner[0]
             elif len(winner) == 0:
@@ -172,7 +177,7 @@ Make sure to respond precisely in this format."""
                     self.scores_increment[player["Name"]] = 1
                     new_state[player["Name"]]["Prizes"] += 1
                 else:
-                    if bids.count(actions[player["Name"]][0]["Door"]) > 1:
+                    if bids[actions[player["Name"]][0]["Door"]] > 1:
                         self.observations[player["Name"]] += "\nSomeone else also chose your door number, you were not unique. "
                     if actions[player["Name"]][0]["Door"] < best:
                         self.observations[player["Name"]] += "\nYour door number was not high enough, someone chose a unique number higher than yours. "
@@ -136,6 +136,11 @@ where str must be one of: """ + ", ".join(self.days)
     def null_action(self):
         return [{"Proposal": random.choice(self.days)}]
 
+    @staticmethod
+    def score_prediction(prediction: list, action: list) -> float:
+        """Accuracy of a predicted action: 1 if the day is right"""
+        return 1 if list(prediction[0].values())[0] == list(action[0].values())[0] else 0
+
     def validate_actions(self, player_id: str, action: list) -> (bool, str):
         """Validate actions for a player."""
         if len(action) == 0:
@@ -165,8 +170,8 @@ where str must be one of: """ + ", ".join(self.days)
         new_state = deepcopy(self.state)
 
         # check if there is agreement
-        days = [actions[x["Name"]][0]["Proposal"] for x in self.players]
-        if all([days[x] == days[0] for x in range(len(days))]):
+        days = [actions[x][0]["Proposal"] for x in self.names]
+        if len(set(days)) == 1:
             observations += f"This week you all agreed on {days[0]}"
             self.result = days[0]
         else:
@@ -178,7 +183,7 @@ where str must be one of: """ + ", ".join(self.days)
             self.result = "None"
 
         # update states
-        for player in [x["Name"] for x in self.players]:
+        for player in self.names:
             new_state[player]["Week"] += 1
             new_state[player]["Last Meetings"].append(self.result)
         self.update_scores()
@@ -48,14 +48,32 @@ You can attack more than one player, but make sure that total shots does not exc
     def null_action(self):
         return [{"Target": player["Name"], "Shots": 0} for player in self.players]
 
+    @staticmethod
+    def score_prediction(prediction: list, action: list) -> float:
+        """Accuracy of a predicted action: targets that were both predicted and shot at, out of all targets of either"""
+        predictions = [p["Target"] for p in prediction if p["Shots"] > 0]
+        actions = [a["Target"] for a in action if a["Shots"] > 0]
+        numplayers = len(list(set(predictions + actions)))
+        misses1 = sum([1 if x not in actions else 0 for x in predictions])
+        misses2 = sum([1 if x not in predictions else 0 for x in actions])
+        misses = misses1 + misses2
+        if numplayers > 0:
+            return (numplayers - misses) / (numplayers)
+        return 1
+
     def validate_actions(self, player_id: str, actions: list):
         """Validate actions for a player."""
         valid = True
         err = ""
         state = self.state[player_id]
         for action in actions:
+            # the target is looked up by name, anything else is not a player
+            if not isinstance(action["Target"], str):
+                valid = False
+                err += "The target must be the name of a player, as a string. "
+                continue
             # if target is not in list of players
-            if action["Target"] not in [x["Name"] for x in self.players] and action["Shots"] > 0:
+            if action["Target"] not in self.index and action["Shots"] > 0:
                 valid = False
                 err = "The target is not a player in the game. Make sure you use precise spelling."
             if action["Target"] in self.eliminated:
@@ -83,7 +101,7 @@ You can attack more than one player, but make sure that total shots does not exc
         self.num_turn = 1
         self.num_game += 1
         self.players = self.config["Players"]
-        self.eliminated = []
+        self.eliminated = set()
         self.scores = {x["Name"]: 0 for x in self.players}
         self.scores_increment = {x["Name"]: 0 for x in self.players}
         if "Initialization" in list(self.config.keys()):
@@ -148,14 +166,14 @@ You can attack more than one player, but make sure that total shots does not exc
                     elif (hit is False) and (shots > 0):
                         observations += f"{player_id} attacked {target} but missed!\n"
 
-        eliminated = list(set(eliminated))
+        eliminated = list(dict.fromkeys(eliminated))
         if len(eliminated) > 0:
             for player in eliminated:
                 # If player is killed, remove them from game
-                if player in ([x["Name"] for x in self.players]) and (player not in self.eliminated):
+                if (player in self.index) and (player not in self.eliminated):
                     observations += f"{player} has been eliminated from the game.\n"
                     new_observations[player] = observations + f"You are out of lives. Your score was {self.scores[player]}."
-                    self.eliminated.append(player)
+                    self.eliminated.add(player)
                     observations += f"The remaining players are: {', '.join([p['Name'] for p in self.players if p['Name'] not in self.eliminated])}.\n"
 
         # Next turn
@@ -171,7 +189,7 @@ You can attack more than one player, but make sure that total shots does not exc
 
         # update scores for living players
         self.update_scores()
-        for player in [x["Name"] for x in self.players if x["Name"] not in self.eliminated]:
+        for player in [x for x in self.names if x not in self.eliminated]:
             new_state[player]["Eliminated"] = len(self.eliminated)
         self.state = new_state
         self.observations = new_observations
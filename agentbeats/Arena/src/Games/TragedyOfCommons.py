@@ -77,6 +77,11 @@ Make sure to respond precisely in this format."""
     def null_action(self):
         return [{"Amount": 0}]
 
+    @staticmethod
+    def score_prediction(prediction: list, action: list) -> float:
+        """Accuracy of a predicted action: how close the predicted amount is, on the 0-100 scale"""
+        return (100 - abs(prediction[0]["Amount"] - action[0]["Amount"])) / 100
+
     def validate_actions(self, player_id: str, action: list) -> (bool, str):
         """Validate actions for a player."""
         valid = True
@@ -101,7 +106,7 @@ Make sure to respond precisely in this format."""
         observations = ""
         old_state = deepcopy(self.state)
         new_state = deepcopy(self.state)
-        num_hauls = sum([actions[x][0]["Amount"] for x in [p["Name"] for p in self.players]])
+        num_hauls = sum([actions[x][0]["Amount"] for x in self.names])
         self.reserve -= num_hauls
         self.reserve += min(0.5 * self.reserve, 200)
         if self.reserve < 10:
@@ -0,0 +1,45 @@
+# Token usage and cost of games.
+# Agents report their token usage per task (chat, predict, act, observe) in the metadata of their responses,
+# the messenger sums it per agent url. Prices are in the currency of choice per million tokens,
+# {"input": ..., "output": ...} keyed by model (as the agent reports it, e.g. "GOOGLE/gemini-2.0-flash"),
+# by agent role, or "default".
+PRICE_UNIT = 1_000_000
+
+
+def usage_cost(counts: dict, price: dict | None) -> float:
+    if not price:
+        return 0.0
+    return (counts.get("input_tokens", 0) * price.get("input", 0) +
+            counts.get("output_tokens", 0) * price.get("output", 0)) / PRICE_UNIT
+
+
+def usage_report(usage: dict, models: dict, roles: dict, prices: dict | None = None) -> dict:
+    """
+    Usage per agent and phase, with token totals and costs.
+    usage: url -> task -> counts (Messenger.take_usage), models: url -> model, roles: url -> agent role
+    """
+    prices = prices or {}
+    report = {"Agents": {}, "Phases": {}, "Tokens": 0, "Cost": 0.0}
+    for url, phases in usage.items():
+        role = roles.get(url, url)
+        model = models.get(url)
+        price = prices.get(model) or prices.get(role) or prices.get("default")
+        agent = {"Model": model, "Phases": phases, "Tokens": 0, "Cost": 0.0}
+        for phase, counts in phases.items():
+            tokens = counts.get("input_tokens", 0) + counts.get("output_tokens", 0)
+            cost = usage_cost(counts, price)
+            agent["Tokens"] += tokens
+            agent["Cost"] += cost
+            total = report["Phases"].setdefault(phase, {"Tokens": 0, "Cost": 0.0})
+            total["Tokens"] += tokens
+            total["Cost"] += cost
+        report["Agents"][role] = agent
+        report["Tokens"] += agent["Tokens"]
+        report["Cost"] += agent["Cost"]
+    return report
+
+
+def valid_prices(prices) -> bool:
+    return isinstance(prices, dict) and all([isinstance(x, dict) and
+                                             all([isinstance(v, (int, float)) for v in x.values()])
+                                             for x in prices.values()])
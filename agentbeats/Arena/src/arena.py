@@ -1,7 +1,10 @@
 import ast
+import asyncio
+import difflib
 import json
 import random
 import time
+from contextlib import nullcontext
 from datetime import datetime
 from fJson import decode
 from typing import Any
@@ -11,7 +14,16 @@ from a2a.types import Message, TaskState, Part, TextPart, DataPart
 from a2a.utils import get_message_text, new_agent_text_message
 from itertools import combinations
 from Games import Survivor, TragedyOfCommons, Scheduler, Coalition, HUPI
-from messenger import Messenger
+from evaluation import RankingEstimator, results_rows
+from messenger import DEFAULT_TIMEOUT, AgentUnavailableError, Messenger
+from scoring import game_metrics, prediction_accuracy
+from logformat import LOG_DETAILS, at_detail, compact
+from encoding import artifact_encodings, artifact_part
+from store import ResultStore, agent_identity
+from profiling import PROFILE_MODES, Profiler
+from protocol import PROTOCOL_URI, PROTOCOL_VERSION, TEMPLATES, PromptTemplates
+from topology import Topology, topology_spec
+from accounting import usage_report, valid_prices
 
 # Game registry
 game_registry = {"Survivor": Survivor.SurvivorEnv,
@@ -35,7 +47,10 @@ def get_names(num_players):
              "Kobayashi", "Karenina", "Leela", "Lana", "Marcus", "Maia", "Nicole", "Nathan", "Oprah", "Orpheus",
              "Penelope", "Plato", "Quincy", "Rodriguez", "Ronda", "Sam", "Satya", "Theodore", "Taylor", "Ulysses",
              "Uri", "Vladimir", "Veronika", "Winston", "Wanda", "Xavier", "Xi", "Yolanda", "Yves", "Zoe", "Zhang"]
-    chosen = list(random.sample(names, k=num_players))
+    # large games number the names again, e.g. Aisha2
+    pool = [name + (str(i // len(names) + 1) if i >= len(names) else "") for i, name in
+            enumerate(names * (1 + (num_players - 1) // len(names)))]
+    chosen = list(random.sample(pool, k=num_players))
     return chosen
 
 
@@ -65,6 +80,17 @@ class Agent:
         self.states = None
         self.logs = []
         self.players = []
+        self.await_observe = True
+        self.pipeline = True
+        self.protocol = PROTOCOL_VERSION
+        self.prompts = None # static text of the game and prompts built from it
+        self.chat_rounds = 3
+        self.adaptive_chat = False
+        self.chat_token_budget = None
+        self.chat_topology = None # chat_topology config, resolved per game
+        self.topology = Topology({"type": "all_pairs"}, [])
+        self.channel = [] # posts to the public channel in the game
+        self.read = {} # player -> number of public posts already sent to it
 
     def validate_request(self, request: EvalRequest) -> tuple[bool, str]:
         missing_roles = set(self.required_roles) - set(request.participants.keys())
@@ -76,6 +102,22 @@ class Agent:
             return False, f"Missing config keys: {missing_config_keys}"
 
         # Add additional request validation here
+        if request.config.get("profile") not in [None] + PROFILE_MODES:
+            return False, f"Unknown profile mode: {request.config['profile']}, expected one of {PROFILE_MODES}"
+        if request.config.get("artifact_encoding", "none") not in artifact_encodings():
+            return False, f"Unsupported artifact encoding: {request.config['artifact_encoding']}, available: {artifact_encodings()}"
+        if request.config.get("log_detail", "full") not in LOG_DETAILS:
+            return False, f"Unknown log detail: {request.config['log_detail']}, expected one of {LOG_DETAILS}"
+        if not valid_prices(request.config.get("prices", {})):
+            return False, "prices should map models or agents to their {\"input\", \"output\"} price per million tokens"
+        for key in ["max_tokens_budget", "max_cost"]:
+            if not isinstance(request.config.get(key, 0), (int, float)):
+                return False, f"{key} should be a number"
+        try:
+            for game in game_registry:
+                topology_spec(request.config.get("chat_topology"), game)
+        except ValueError as e:
+            return False, str(e)
 
         return True, "ok"
 
@@ -103,9 +145,47 @@ class Agent:
         # Use request.participants to get participant agent URLs by role
         # Use request.config for assessment parameters
         print("participants in arena: ", request.participants)
+        # stream agent responses, and stop reading them once the closing tag arrives
+        self.messenger.streaming = request.config.get("streaming", False)
+        # whether to wait for each agent to acknowledge its observations before moving on
+        self.await_observe = request.config.get("await_observe", True)
+        # run each player's predict -> act chain concurrently with the other players'
+        self.pipeline = request.config.get("pipeline", True)
+        # highest protocol version to use with agents that support it, 1 sends the full prompts as text
+        self.protocol = request.config.get("protocol", PROTOCOL_VERSION)
+        # chat exchanges per pair, whether pairs may end their chat early, and a cap on chat tokens per game round
+        self.chat_rounds = request.config.get("chat_rounds", 3)
+        self.adaptive_chat = request.config.get("adaptive_chat", False)
+        self.chat_token_budget = request.config.get("chat_token_budget")
+        # who chats with whom, for all games or per game (see topology.py), all pairs by default
+        self.chat_topology = request.config.get("chat_topology")
+        # per-message timeout, and circuit breaker for agents that keep failing
+        self.messenger.timeout = request.config.get("agent_timeout", DEFAULT_TIMEOUT)
+        self.messenger.failure_threshold = request.config.get("failure_threshold", 3)
+        self.messenger.reset_timeout = request.config.get("reset_timeout", 60)
+
+        # check all participants before planning, and leave out the ones that cannot be reached
+        participants = request.participants
+        if request.config.get("preflight", True):
+            report = await self.preflight(participants, timeout=request.config.get("preflight_timeout", 10))
+            await updater.add_artifact(
+                parts=[
+                    Part(root=DataPart(data={
+                        "preflight": report,
+                    }))
+                ],
+                name="Preflight",
+            )
+            participants = {role: url for role, url in participants.items() if report[role]["reachable"]}
+            unreachable = [role for role in report if not report[role]["reachable"]]
+            if len(unreachable) > 0:
+                print("unreachable participants: ", unreachable)
+                await updater.update_status(
+                    TaskState.working, new_agent_text_message(f"Excluding unreachable participants: {', '.join(unreachable)}")
+                )
 
         # populate set of possible compositions of players
-        num_agents = len(request.participants)
+        num_agents = len(participants)
         required = request.config.get("required") # list of participants that are compulsory to run in game
         if isinstance(required, list) and len(required) == 0:
             required = None
@@ -116,9 +196,9 @@ class Agent:
         min_size = request.config.get("min_size", 2)
         for i in range(min_size, min(num_agents + 1, max_size + 1)):
             if required is not None:
-                compositions += [x for x in combinations(list(request.participants.items()), i) if all([p in list(x) for p in required])]
+                compositions += [x for x in combinations(list(participants.items()), i) if all([p in list(x) for p in required])]
             else:
-                compositions += [x for x in combinations(list(request.participants.items()), i)]
+                compositions += [x for x in combinations(list(participants.items()), i)]
 
         # build all possible game X scenario X players combinations
         runs = []
@@ -127,15 +207,87 @@ class Agent:
                 for s in [1, 2]:
                     runs.append({"composition": c, "game": g, "scenario": s})
 
+        # in incremental mode, games between the same agents (by card name/version and url) are reused from the store,
+        # so only the runs that include new or changed participants are played
+        store = None
+        stored = []
+        if request.config.get("incremental", False):
+            store = ResultStore(request.config.get("result_store", "results.db"))
+            identities = {url: agent_identity(await self.messenger.get_card(url), url) for url in participants.values()}
+            fresh = []
+            for run in runs:
+                rows = store.get(run["game"], run["scenario"], [identities[x[1]] for x in run["composition"]])
+                if rows is None:
+                    fresh.append(run)
+                else:
+                    stored.append((run, rows))
+            runs = fresh
+            print(f"reusing {len(stored)} stored games, {len(runs)} runs left to play")
+
         # limit by max runs
+        # in adaptive mode, runs are chosen one at a time until the ranking is settled, and max_runs is a cap
+        # game logs in the artifacts: detail level, and optionally repeated strings stored once (see logformat.py)
+        # by default the logs are sent as they are
+        log_detail = request.config.get("log_detail", "full")
+        compact_logs = request.config.get("compact_logs", False)
+        # game and results artifacts as JSON data, or compressed (gzip, zstd) in a file part
+        artifact_encoding = request.config.get("artifact_encoding", "none")
+        # profile selected games of a live run (all games if none are listed)
+        profile = request.config.get("profile")
+        profile_games = request.config.get("profile_games")
         max_runs = request.config.get("max_runs")
-        if (max_runs is not None) and (max_runs < len(runs)):
+        adaptive = request.config.get("adaptive", False)
+        # token usage of the games, costed with the prices, and caps on the total after which no new game is started
+        prices = request.config.get("prices", {})
+        max_tokens_budget = request.config.get("max_tokens_budget")
+        max_cost = request.config.get("max_cost")
+        spent = {"tokens": 0, "cost": 0.0, "budget_reached": False}
+        estimator = None
+        if adaptive:
+            estimator = RankingEstimator(list(participants.keys()),
+                                         confidence=request.config.get("confidence", 0.95),
+                                         tolerance=request.config.get("tolerance", 0.05),
+                                         min_games=request.config.get("min_games", 3))
+            random.shuffle(runs)
+        elif (max_runs is not None) and (max_runs < len(runs)):
             # sample random compositions
             runs = random.sample(runs, max_runs)
 
+        data = []
+        skipped = []
         game_id = 1
+        for run, rows in stored:
+            # relabel the stored rows with this evaluation's roles
+            roles = {identities[x[1]]: x[0] for x in run["composition"]}
+            rows = [dict(row, agent=roles[row["agent"]], game_id=game_id) for row in rows]
+            data += rows
+            if estimator is not None:
+                estimator.update(rows)
+            game_id += 1
+        reused = game_id - 1
         # iterate over compositions
-        for run in runs:
+        while len(runs) > 0:
+            if (((max_tokens_budget is not None) and (spent["tokens"] >= max_tokens_budget)) or
+                    ((max_cost is not None) and (spent["cost"] >= max_cost))):
+                spent["budget_reached"] = True
+                print(f"budget reached after {game_id - 1} games: {spent['tokens']} tokens, cost {spent['cost']:.4f}")
+                await updater.update_status(
+                    TaskState.working, new_agent_text_message(f"Budget reached after {game_id - 1} games")
+                )
+                break
+            if estimator is not None:
+                if estimator.is_settled():
+                    print(f"ranking settled after {game_id - 1} games")
+                    await updater.update_status(
+                        TaskState.working, new_agent_text_message(f"Ranking settled after {game_id - 1} games")
+                    )
+                    break
+                if (max_runs is not None) and (game_id - reused > max_runs):
+                    break
+                run = estimator.next_run(runs)
+                runs.remove(run)
+            else:
+                run = runs.pop(0)
             # iterate over runs
             group = run["composition"]
             game = run["game"]
@@ -150,44 +302,80 @@ class Agent:
                          "Max_num_turns": max_turns[game]}
             # ---------------------------
             # send task for orchestration
-            log = await self.orchestrate_game(updater)
+            profiler = None
+            if (profile is not None) and ((profile_games is None) or (game_id in profile_games)):
+                profiler = Profiler(profile, top=request.config.get("profile_top", 30))
+            roles = {x["Url"]: x["Agent"] for x in self.players}
+            try:
+                with profiler or nullcontext():
+                    log = await self.orchestrate_game(updater)
+            except AgentUnavailableError as e:
+                # a failing agent only costs the games it is in, not the whole evaluation
+                print(f"Skipping game {game_id}: {e}")
+                skipped.append({"game_id": game_id, "game": game, "scenario": scenario,
+                                "agents": [x["Agent"] for x in self.players], "error": str(e)})
+                await updater.update_status(
+                    TaskState.working, new_agent_text_message(f"Skipped game {game_id}: {e}")
+                )
+                try:
+                    await self.messenger.flush()
+                except Exception:
+                    pass
+                # the tokens spent before the game was given up still count against the budget
+                usage = usage_report(self.messenger.take_usage(), self.messenger.models, roles, prices)
+                spent["tokens"] += usage["Tokens"]
+                spent["cost"] += usage["Cost"]
+                skipped[-1]["usage"] = usage
+                game_id += 1
+                continue
             # ---------------------------
             # send back message about status
             await updater.update_status(
                 TaskState.working, new_agent_text_message(f"Finished game: {game_id}")
             )
-            self.logs.append(log)
+            log["Usage"] = usage_report(self.messenger.take_usage(), self.messenger.models, roles, prices)
+            spent["tokens"] += log["Usage"]["Tokens"]
+            spent["cost"] += log["Usage"]["Cost"]
+            # only the metrics of finished games are kept in memory
+            self.logs.append(at_detail(log, "metrics_only"))
             # update
             await updater.add_artifact(
                 parts=[
-                    Part(root=DataPart(data={
-                        f"Game{game_id}": log
-                    }))
+                    artifact_part({
+                        f"Game{game_id}": compact(log, log_detail) if compact_logs else at_detail(log, log_detail)
+                    }, artifact_encoding, name=f"Game{game_id}")
                 ],
                 name=f"Game{game_id}",
             )
+            if profiler is not None:
+                await updater.add_artifact(
+                    parts=[
+                        Part(root=DataPart(data={
+                            f"Profile{game_id}": profiler.stats()
+                        }))
+                    ],
+                    name=f"Profile{game_id}",
+                )
+            # evaluate game
+            rows = results_rows(log)
+            data += rows
+            if store is not None:
+                keys = {x["Agent"]: identities[x["Url"]] for x in self.players}
+                store.put(game, scenario, list(keys.values()), [dict(row, agent=keys[row["agent"]]) for row in rows])
+            if estimator is not None:
+                estimator.update(rows)
             # iterate game_id number
             game_id += 1
-        # evaluate games
-        data = []
-        for game in self.logs:
-            agents = game["Participants"]
-            for agent in list(agents.keys()):
-                data.append({"game_id": game["GameID"],
-                             "game": game["Game"],
-                             "scenario": game["Scenario"],
-                             "num_players": len(list(agents.keys())),
-                             "agent": agent,
-                             "name": game["Participants"][agent],
-                             "prediction_acc": game["PredAccuracy"][agent],
-                             "transparency": game["Transparency"][agent],
-                             "score": game["Scores"][agent]})
+        if store is not None:
+            store.close()
 
         await updater.add_artifact(
             parts=[
-                Part(root=DataPart(data={
+                artifact_part({
                     "results": data,
-                }))
+                    "skipped": skipped,
+                    "usage": spent,
+                }, artifact_encoding, name="Results")
             ],
             name="Results",
         )
@@ -196,232 +384,279 @@ class Agent:
             TaskState.completed, new_agent_text_message(f"Completed Evaluation!")
         )
 
+    async def preflight(self, participants: dict[str, str], timeout: float) -> dict:
+        """Probe all participants at once, recording agent card fetch and echo latency"""
+        async def probe(role, url):
+            report = {"url": url, "reachable": False, "card_latency": None, "echo_latency": None, "error": None}
+            try:
+                start = time.perf_counter()
+                await self.messenger.get_card(url, timeout=timeout)
+                report["card_latency"] = time.perf_counter() - start
+                start = time.perf_counter()
+                await self.messenger.talk_to_agent(message=json.dumps({"task": "ping", "message": "", "info": None}),
+                                                   url=url, new_conversation=True, timeout=timeout)
+                report["echo_latency"] = time.perf_counter() - start
+                report["reachable"] = True
+            except Exception as e:
+                report["error"] = str(e) or type(e).__name__
+            return role, report
+
+        return dict(await asyncio.gather(*[probe(role, url) for role, url in participants.items()]))
+
     async def onboarding(self) -> None:
+        remaining = [x for x in self.env.names if x not in self.env.eliminated]
         for player in self.players:
-            prompt = ("Background: " + self.env.game_description() +
-                      "\nYour Name: " + player["Name"] +
-                      "\nOther Players: " + ", ".join([x["Name"] for x in self.env.players if ((x["Name"] not in self.env.eliminated) and (x["Name"] != player["Name"]))]) +
-                      "\nYour Preferences: " + self.env.get_preferences(player["Name"]))
+            others = [x for x in remaining if x != player["Name"]]
+            prompt = self.prompts.background(player["Name"], others)
             info = {"name": player["Name"],
-                    "opponents": [x["Name"] for x in self.env.players if ((x["Name"] not in self.env.eliminated) and (x["Name"] != player["Name"]))],
-                    "preferences": self.env.get_preferences(player["Name"])}
-            await self.messenger.talk_to_agent(message=json.dumps({"task": "background",
-                                                                   "message": prompt,
-                                                                   "info": info}),
-                                               url=player["Url"], new_conversation=True)
+                    "opponents": others,
+                    "preferences": self.prompts.preferences[player["Name"]]}
+            if (self.protocol >= 2) and (await self.messenger.supports(player["Url"], PROTOCOL_URI)):
+                player["Protocol"] = PROTOCOL_VERSION
+                # static text of the game, cached by the agent for the rest of the game
+                message = {"protocol": PROTOCOL_VERSION, "task": "background", "message": prompt, "info": info,
+                           "static": {"templates": TEMPLATES, "action_format": self.prompts.action_format}}
+            else:
+                player["Protocol"] = 1
+                message = json.dumps({"task": "background", "message": prompt, "info": info})
+            await self.messenger.talk_to_agent(message=message, url=player["Url"], new_conversation=True)
         return
 
-    async def facilitate_chat(self, max_rounds: int = 3) -> None:
-        """Helper method to get and send messages between players in a centralized fashion"""
+    def encode(self, player: dict, task: str, template: str, params: dict, info) -> tuple:
+        """Message to a player in its protocol version, and the prompt text it stands for (version 1 only)"""
+        return self.prompts.encode(player["Protocol"], player["Name"], task, template, params, info)
+
+    async def chat_turn(self, speaker: dict, listener: str, msg: dict | None, adaptive: bool) -> str:
+        """Get the speaker's next message to the listener, msg is the listener's last message (None to open the chat)"""
+        end = "_end" if adaptive else ""
+        if msg is not None:
+            # version 2 carries the message once, in the params
+            info = msg if speaker["Protocol"] < 2 else {"from": msg["from"], "to": msg["to"]}
+            message, _ = self.encode(speaker, "chat", "chat_reply" + end, {"other": listener, "message": str(msg["message"])}, info)
+        else:
+            msg = {"from": listener, "to": speaker["Name"], "message": "Hello"}
+            message, _ = self.encode(speaker, "chat", "chat_open" + end, {"other": listener}, msg)
+        response = await self.messenger.talk_to_agent(message=message, url=speaker["Url"], stop="</message>")
+        # parse message
+        return response.split("<message>")[-1].split("</message>")[0]
+
+    async def facilitate_chat(self, max_rounds: int = 3, adaptive: bool = False, token_budget: int | None = None) -> None:
+        """
+        Helper method to get and send messages between players in a centralized fashion.
+        In adaptive mode, a pair stops chatting once both have ended the conversation (with <end/>),
+        or once one of them repeats its previous message almost word for word.
+        All chats stop once their estimated token count (4 characters per token) exceeds the token budget.
+        The pairs that chat are given by the topology of the game.
+        """
         # construct a conversation
-        player_key = {x["Name"]: x["Url"] for x in self.players if x["Name"] not in self.env.eliminated}
+        player_key = {x["Name"]: x for x in self.players if x["Name"] not in self.env.eliminated}
         player_names = [x["Name"] for x in self.players if x["Name"] not in self.env.eliminated]
         random.shuffle(player_names)
-        pairs = [tuple(p) for p in combinations(player_names, 2)]
+        if self.topology.kind == "public":
+            await self.public_chat(player_key, player_names, token_budget)
+            return
+        pairs = self.topology.pairs(player_names)
         self.chats = {pair: [] for pair in pairs}
+        ended = {pair: set() for pair in pairs}
+        active = list(pairs)
+        tokens = 0
         for _ in range(max_rounds):
-            for pair in pairs:
-                first = pair[0]
-                second = pair[1]
-                # get message
-                if (len(self.chats[(first, second)]) > 0) and (self.chats[(first, second)][-1]["from"] == second):
-                    msg = self.chats[(first, second)][-1]
-                    prompt = f"In your chat with {second}, you received the message: " + str(msg["message"])
-                    prompt += f"\nGive your response to {second}. "
-                else:
-                    msg = {"from": second, "to": first, "message": "Hello"}
-                    prompt = f"Initiate a chat with {second}."
-                prompt += f"Address {second} directly without any other text. "
-                prompt += f"Place your message between the <message> </message> tags, i.e. <message> your message to {second} here </message>"
-                response = await self.messenger.talk_to_agent(message=str(json.dumps({"task": "chat", "message": prompt, "info": msg})),
-                                                              url=player_key[first])
-                # parse message
-                response = response.split("<message>")[-1].split("</message>")[0]
-                # update chat
-                msg = {"from": first, "to": second, "message": response}
-                self.chats[(first, second)].append(msg)
-                # send message and get response
-                prompt = f"In your chat with {first}, you received the message: " + str(msg["message"])
-                prompt += f"\nGive your response to {first}."
-                prompt += f"Address {first} directly without any other text. "
-                prompt += f"Place your message between the <message> </message> tags, i.e. <message> your message to {first} here </message>"
-                response = await self.messenger.talk_to_agent(message=str(json.dumps({"task": "chat", "message": prompt, "info": msg})),
-                                                              url=player_key[second])
-                # parse message
-                response = response.split("<message>")[-1].split("</message>")[0]
-                self.chats[(first, second)].append({"from": second, "to": first, "message": response})
+            for pair in list(active):
+                for speaker, listener in [pair, pair[::-1]]:
+                    chat = self.chats[pair]
+                    last = chat[-1] if (len(chat) > 0) and (chat[-1]["from"] == listener) else None
+                    response = await self.chat_turn(player_key[speaker], listener, last, adaptive)
+                    tokens += len(response) // 4
+                    done = False
+                    if adaptive:
+                        if "<end/>" in response:
+                            ended[pair].add(speaker)
+                            response = response.replace("<end/>", "").strip()
+                        previous = [x["message"] for x in chat if x["from"] == speaker]
+                        repeated = (len(previous) > 0) and (difflib.SequenceMatcher(None, previous[-1], response).ratio() >= 0.9)
+                        done = repeated or (len(ended[pair]) == 2)
+                    # update chat
+                    chat.append({"from": speaker, "to": listener, "message": response})
+                    if (token_budget is not None) and (tokens >= token_budget):
+                        print(f"chat token budget reached after {tokens} tokens")
+                        return
+                    if done:
+                        active.remove(pair)
+                        break
         return
 
-    async def get_predictions(self):
-        # base prompt
-        base_prompt = ("Enclose your main reasons within the <reasoning> </reasoning> tags." +
-                  "\nThen make your prediction and enclose it within the <prediction> </prediction> tags, " +
-                  "i.e. <reasoning> main reasons here </reasoning> <prediction> predicted actions here </prediction>.\n" +
-                  r"For the formal predictions between the <prediction> </prediction> tags, use the following JSON format:" +
-                  self.env.action_format()["template"])
-        self.predictions = {player["Name"]: {} for player in self.players}
-        for player in [x for x in self.players if x["Name"] not in self.env.eliminated]:
-            for other in [x for x in self.players if x["Name"] not in self.env.eliminated]:
-                if player["Name"] == other["Name"]:
-                    continue
-                else:
-                    print(f"{player['Name']} predicting {other['Name']}")
-                    prompt = (f"Ok {player['Name']}, it is nearing decision time for everyone. " + self.env.action_format()["description"] +
-                              "\nDO NOT make your decision just yet. Consider the events so far, your last chats and the current situation. " +
-                              f"Then predict ONLY what **{other['Name']}** will do next.\n" + base_prompt)
-                    pred = await self.messenger.talk_to_agent(message=str(json.dumps({"task": "predict", "message": prompt, "info": other["Name"]})),
-                                                              url=player["Url"])
-                    # parse prediction
-                    reasoning = pred.split("<reasoning>")[-1].split("</reasoning>")[0]
-                    prediction = pred.split("<prediction>")[-1].split("</prediction>")[0]
-                    # try to deserialize prediction
-                    # if it doesn't work, just keep the string
-                    try:
-                        # json
-                        prediction = json.loads(prediction)
-                    except json.decoder.JSONDecodeError as err:
+    async def public_chat(self, player_key: dict, player_names: list[str], token_budget: int | None = None) -> None:
+        """Each player posts once to the public channel, after reading the posts since its last one"""
+        posts = []
+        self.chats = {"Public": posts}
+        tokens = 0
+        for speaker in player_names:
+            unread = self.channel[self.read.get(speaker, 0):]
+            text = "".join([f"\n{x['from']}: {x['message']}" for x in unread]) if len(unread) > 0 else "none"
+            others = ", ".join([x for x in player_names if x != speaker])
+            info = {"from": "Public", "to": speaker, "posts": unread}
+            if player_key[speaker]["Protocol"] < 2:
+                info["message"] = unread[-1]["message"] if len(unread) > 0 else ""
+            message, _ = self.encode(player_key[speaker], "chat", "public", {"others": others, "posts": text}, info)
+            response = await self.messenger.talk_to_agent(message=message, url=player_key[speaker]["Url"], stop="</message>")
+            response = response.split("<message>")[-1].split("</message>")[0].replace("<end/>", "").strip()
+            post = {"from": speaker, "to": "Public", "message": response}
+            posts.append(post)
+            self.channel.append(post)
+            self.read[speaker] = len(self.channel)
+            tokens += len(response) // 4
+            if (token_budget is not None) and (tokens >= token_budget):
+                print(f"chat token budget reached after {tokens} tokens")
+                return
+
+    async def get_predictions(self, player):
+        for other in [x for x in self.players if x["Name"] not in self.env.eliminated]:
+            if player["Name"] == other["Name"]:
+                continue
+            else:
+                print(f"{player['Name']} predicting {other['Name']}")
+                message, _ = self.encode(player, "predict", "predict", {"other": other["Name"]}, other["Name"])
+                pred = await self.messenger.talk_to_agent(message=message, url=player["Url"], stop="</prediction>")
+                # parse prediction
+                reasoning = pred.split("<reasoning>")[-1].split("</reasoning>")[0]
+                prediction = pred.split("<prediction>")[-1].split("</prediction>")[0]
+                # try to deserialize prediction
+                # if it doesn't work, just keep the string
+                try:
+                    # json
+                    prediction = json.loads(prediction)
+                except json.decoder.JSONDecodeError as err:
+                        try:
+                            # ast
+                            prediction = ast.literal_eval(prediction)
+                        except Exception:
                             try:
-                                # ast
-                                prediction = ast.literal_eval(prediction)
+                                # fJson
+                                prediction = decode(prediction)
                             except Exception:
-                                try:
-                                    # fJson
-                                    prediction = decode(prediction)
-                                except Exception:
-                                    pass
-                    self.predictions[player["Name"]][other["Name"]] = {"reasoning": reasoning, "prediction": prediction}
+                                pass
+                self.predictions[player["Name"]][other["Name"]] = {"reasoning": reasoning, "prediction": prediction}
         return
 
-    async def get_actions(self):
-        prompt = (self.env.action_format()["description"] +
-                    "Enclose your main reasons within the <reasoning> </reasoning> tags." +
-                    "\nThen make your decision and enclose it within the <decision> </decision> tags, " +
-                    "i.e. <reasoning> main reasons here </reasoning> <decision> final actions here </decision>.\n" +
-                    r"For the formal decision between the <decision> </decision> tags, use the following JSON format:" +
-                    self.env.action_format()["template"])
-        self.actions = {}
-        for player in [x for x in self.players if x["Name"] not in self.env.eliminated]:
-            prompt = f"Ok, {player['Name']}, now it is time to make your decision.\n" + prompt
-            action = await self.messenger.talk_to_agent(message=str(json.dumps({"task": "act", "message": prompt, "info": self.env.action_format()["template"]})),
-                                                        url=player["Url"])
-            reasoning = action.split("<reasoning>")[-1].split("</reasoning>")[0]
-            decision = action.split("</reasoning>")[-1].split("<decision>")[-1].split("</decision>")[0]
-            # validate action, 3 attempts
-            for _ in range(3):
-                # deserialize actions
-                valid, err = False, None
+    async def get_action(self, player) -> dict:
+        template = self.prompts.action_format["template"]
+        # version 2 agents have the action format from onboarding, so it is not sent with every decision
+        info = template if player["Protocol"] < 2 else None
+        message, _ = self.encode(player, "act", "act", {}, info)
+        action = await self.messenger.talk_to_agent(message=message, url=player["Url"], stop="</decision>")
+        reasoning = action.split("<reasoning>")[-1].split("</reasoning>")[0]
+        decision = action.split("</reasoning>")[-1].split("<decision>")[-1].split("</decision>")[0]
+        # validate action, 3 attempts
+        for _ in range(3):
+            # deserialize actions
+            valid, err = False, None
+            try:
+                decision = json.loads(decision)
+                valid = True
+            except json.decoder.JSONDecodeError:
                 try:
-                    decision = json.loads(decision)
+                    decision = ast.literal_eval(decision)
                     valid = True
-                except json.decoder.JSONDecodeError:
+                except Exception as e:
+                    err = e
                     try:
-                        decision = ast.literal_eval(decision)
+                        decision = decode(decision)
                         valid = True
-                    except Exception as e:
-                        err = e
-                        try:
-                            decision = decode(decision)
-                            valid = True
-                        except Exception:
-                            valid = False
-                if not valid: # failed to deserialize
-                    prompt += "\nYour response was: " + str(decision) + "\nInvalid response."
-                    if err is not None:
-                        prompt += f"\nError message: {err}"
-                    prompt += "\nRequired format (reminder):\n" + self.env.action_format()["template"]
-                    prompt += "\nTry again, just with your final decision between the <decision> </decision> tags (no reasoning)."
-                    action = await self.messenger.talk_to_agent(message=str(
-                        json.dumps({"task": "act", "message": prompt, "info": self.env.action_format()["template"]})),
-                                                                url=player["Url"])
+                    except Exception:
+                        valid = False
+            if not valid: # failed to deserialize
+                params = {"response": str(decision), "error": f"\nError message: {err}" if err is not None else ""}
+                message, _ = self.encode(player, "act", "act_retry_format", params, info)
+                action = await self.messenger.talk_to_agent(message=message, url=player["Url"], stop="</decision>")
+                decision = action.split("</reasoning>")[-1].split("<decision>")[-1].split("</decision>")[0]
+            else:
+                if isinstance(decision, dict):
+                    print("listifying decision: ", decision)
+                    decision = [decision]
+                if (not isinstance(decision, list)) or (not all([isinstance(x, dict) for x in decision])):
+                    valid = False
+                    err = "Incorrect format for the decision. Make sure to use the form list[dict] (a single list containing only dicts)."
+                else:
+                    valid, err = self.env.validate_actions(player["Name"], decision)
+                if not valid:
+                    print("Error validating decision: ", decision)
+                    print("Error: ", err)
+                    params = {"decision": str(decision), "error": err}
+                    message, _ = self.encode(player, "act", "act_retry_invalid", params, info)
+                    action = await self.messenger.talk_to_agent(message=message, url=player["Url"], stop="</decision>")
                     decision = action.split("</reasoning>")[-1].split("<decision>")[-1].split("</decision>")[0]
                 else:
-                    if isinstance(decision, dict):
-                        print("listifying decision: ", decision)
-                        decision = [decision]
-                    if (not isinstance(decision, list)) or (not all([isinstance(x, dict) for x in decision])):
-                        valid = False
-                        err = "Incorrect format for the decision. Make sure to use the form list[dict] (a single list containing only dicts)."
-                    else:
-                        valid, err = self.env.validate_actions(player["Name"], decision)
-                    if not valid:
-                        print("Error validating decision: ", decision)
-                        print("Error: ", err)
-                        prompt += "\nYour decision was: " + str(decision)
-                        prompt += "\nError message: " + err
-                        prompt += "\nTry again, just with your final decision between the <decision> </decision> tags (no reasoning)."
-                        action = await self.messenger.talk_to_agent(message=str(json.dumps({"task": "act", "message": prompt, "info": self.env.action_format()["template"]})),
-                                                                    url=player["Url"])
-                        decision = action.split("</reasoning>")[-1].split("<decision>")[-1].split("</decision>")[0]
-                    else:
-                        # successful
-                        break
-            if valid is False:
-                print("Using null action")
-                decision = self.env.null_action()
-                reasoning = "error"
-            self.actions[player["Name"]] = {"reasoning": reasoning, "action": decision}
+                    # successful
+                    break
+        if valid is False:
+            print("Using null action")
+            decision = self.env.null_action()
+            reasoning = "error"
+        return {"reasoning": reasoning, "action": decision}
+
+    async def get_decisions(self):
+        """
+        Predictions and actions of all active players for this round.
+        A player's decision depends only on its own predictions, so each player's predict -> act chain runs
+        independently of the others, and the round waits only for the slowest chain.
+        """
+        active = [x for x in self.players if x["Name"] not in self.env.eliminated]
+        self.predictions = {player["Name"]: {} for player in self.players}
+        actions = {}
+
+        async def chain(player):
+            await self.get_predictions(player)
+            actions[player["Name"]] = await self.get_action(player)
+
+        if self.pipeline:
+            # a failing chain cancels the others, so none keeps messaging agents after the game is skipped
+            try:
+                async with asyncio.TaskGroup() as group:
+                    for player in active:
+                        group.create_task(chain(player))
+            except ExceptionGroup as e:
+                raise e.exceptions[0]
+        else:
+            for player in active:
+                await chain(player)
+        # keep the seating order, regardless of which chain finished first
+        self.actions = {player["Name"]: actions[player["Name"]] for player in active}
         return
 
     async def send_observations(self):
         for player in [x for x in self.players if x["Name"] not in self.env.eliminated]:
-            prompt = "Your next observations: " + str(self.observations[player["Name"]])
-            prompt += "\nYour next state: " + json.dumps(self.states[player["Name"]])
-            prompt += "\nYour current score: " + json.dumps(self.env.scores[player["Name"]])
-            await self.messenger.talk_to_agent(message=str(json.dumps({"task": "observe", "message": prompt, "info": self.states[player["Name"]]})),
-                                               url=player["Url"])
+            params = {"observations": str(self.observations[player["Name"]]),
+                      "state": json.dumps(self.states[player["Name"]]),
+                      "score": json.dumps(self.env.scores[player["Name"]])}
+            message, _ = self.encode(player, "observe", "observe", params, self.states[player["Name"]])
+            if self.await_observe:
+                await self.messenger.talk_to_agent(message=message, url=player["Url"])
+            else:
+                # the next message to this agent waits for the acknowledgement instead
+                self.messenger.post(message=message, url=player["Url"])
         return
 
     async def calculate_pred_accuracy(self):
+        engine = game_registry[self.task["Game"]]
         for player in list(self.predictions.keys()):
             for other in list(self.predictions[player].keys()):
-                pred = self.predictions[player][other]["prediction"]
-                if isinstance(pred, dict):
-                    pred = [pred]
-                elif (not isinstance(pred, list)) or (len(pred) == 0):
-                    self.predictions[player][other]["accuracy"] = "invalid"
-                    continue
-                action = self.actions[other]["action"]
-                if (not isinstance(action, list) or len(action) == 0):
-                    self.predictions[player][other]["accuracy"] = "invalid"
-                    continue
-                if self.task["Game"] == "Survivor":
-                    predictions = [p["Target"] for p in pred if p["Shots"] > 0]
-                    actions = [a["Target"] for a in action if a["Shots"] > 0]
-                    numplayers = len(list(set(predictions + actions)))
-                    misses1 = sum([1 if x not in actions else 0 for x in predictions])
-                    misses2 = sum([1 if x not in predictions else 0 for x in actions])
-                    misses = misses1 + misses2
-                    if numplayers > 0:
-                        acc = (numplayers - misses) / (numplayers)
-                    else:
-                        acc = 1
-                    self.predictions[player][other]["accuracy"] = acc
-                elif self.task["Game"] == "Scheduler":
-                    acc = 1 if list(pred[0].values())[0] == list(action[0].values())[0] else 0
-                    self.predictions[player][other]["accuracy"] = acc
-                elif self.task["Game"] == "Coalition":
-                    prediction = pred[0]["Amount"]
-                    act = action[0]["Amount"]
-                    acc = (20 - abs(prediction - act)) / 20
-                    self.predictions[player][other]["accuracy"] = acc
-                elif self.task["Game"] == "TragedyOfCommons":
-                    acc = (100 - abs(pred[0]["Amount"] - action[0]["Amount"])) / 100
-                    self.predictions[player][other]["accuracy"] = acc
-                elif self.task["Game"] == "HUPI":
-                    acc = 1 if list(pred[0].values())[0] == list(action[0].values())[0] else 0
-                    self.predictions[player][other]["accuracy"] = acc
+                self.predictions[player][other]["accuracy"] = prediction_accuracy(
+                    engine, self.predictions[player][other]["prediction"], self.actions[other]["action"])
         return
 
     async def orchestrate_game(self, updater):
         print("running: ", self.task["Game"])
         print("with: ", self.players)
         self.env = game_registry[self.task["Game"]](self.task)
+        self.prompts = PromptTemplates(self.env)
+        self.topology = Topology(topology_spec(self.chat_topology, self.task["Game"]), [x["Name"] for x in self.players])
         log = {"GameID": self.task["Id"],
                "Game": self.task["Game"],
                "Scenario": self.task["Scenario"],
                "NumPlayers": len(self.players),
                "Participants": {x["Agent"]: x["Name"] for x in self.players},
-               "Preferences": {x: self.env.get_preferences(x) for x in [p["Name"] for p in self.players]},
+               "Preferences": {x["Name"]: self.prompts.preferences[x["Name"]] for x in self.players},
+               "Topology": self.topology.describe(),
                "Rounds": [],
                "Scores": None,
                "Completed": False,
@@ -433,17 +668,17 @@ class Agent:
         self.actions = {}
         self.observations = {}
         self.states = None
+        self.channel = []
+        self.read = {}
         # Let the games begin!
         await self.onboarding()
         round = 1
         # iterate until game ends
         while not self.env.is_game_over():
             # facilitate chat
-            await self.facilitate_chat()
-            # get predictions
-            await self.get_predictions()
-            # get actions
-            await self.get_actions()
+            await self.facilitate_chat(max_rounds=self.chat_rounds, adaptive=self.adaptive_chat, token_budget=self.chat_token_budget)
+            # get predictions and actions
+            await self.get_decisions()
             # process decisions
             self.observations, self.states = self.env.process_actions({x: self.actions[x]["action"] for x in list(self.actions.keys())})
             # calculate prediction accuracies
@@ -465,32 +700,11 @@ class Agent:
             )
             round += 1
 
+        await self.messenger.flush()
         # log final scores in game
         log["Scores"] = {x["Agent"]: self.env.scores[x["Name"]] for x in self.players}
         # log prediction accuracies in game
-        log["PredAccuracy"] = {}
-        log["Transparency"] = {}
-        for player in self.players:
-            preds = []
-            transparency = []
-            for stage in log["Rounds"]:
-                preds_round = stage["Predictions"][player["Name"]]
-                for other in list(preds_round.keys()):
-                    if isinstance(preds_round[other], dict) and (isinstance(preds_round[other]["accuracy"], float) or isinstance(preds_round[other]["accuracy"], int)):
-                        preds.append(preds_round[other]["accuracy"])
-                for other in self.players:
-                    if other["Name"] != player["Name"]:
-                        pred_other = stage["Predictions"][other["Name"]].get(player["Name"])
-                        if isinstance(pred_other, dict) and (isinstance(pred_other["accuracy"], float) or isinstance(pred_other["accuracy"], int)):
-                            transparency.append(pred_other["accuracy"])
-            if len(preds) > 0:
-                log["PredAccuracy"][player["Agent"]] = sum(preds)/len(preds)
-            else:
-                log["PredAccuracy"][player["Agent"]] = -1
-            if len(transparency) > 0:
-                log["Transparency"][player["Agent"]] = sum(transparency)/len(transparency)
-            else:
-                log["Transparency"][player["Agent"]] = -1
+        log["PredAccuracy"], log["Transparency"] = game_metrics(log)
         end_time = time.time()
         duration = end_time - start_time
         log["Duration"] = duration
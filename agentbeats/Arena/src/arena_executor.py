@@ -57,6 +57,9 @@ class Executor(AgentExecutor):
         except Exception as e:
             print(f"Task failed with arena error: {e}")
             await updater.failed(new_agent_text_message(f"arena error: {e}", context_id=context_id, task_id=task.id))
+        finally:
+            # pooled connections to the participants
+            await agent.messenger.close()
 
     async def cancel(self, context: RequestContext, event_queue: EventQueue) -> None:
         raise ServerError(error=UnsupportedOperationError())
@@ -0,0 +1,99 @@
+import math
+import statistics
+from itertools import combinations
+
+
+def results_rows(log: dict) -> list[dict]:
+    """Rows of the results table for a single game log"""
+    agents = log["Participants"]
+    rows = []
+    for agent in list(agents.keys()):
+        rows.append({"game_id": log["GameID"],
+                     "game": log["Game"],
+                     "scenario": log["Scenario"],
+                     "num_players": len(list(agents.keys())),
+                     "agent": agent,
+                     "name": log["Participants"][agent],
+                     "prediction_acc": log["PredAccuracy"][agent],
+                     "transparency": log["Transparency"][agent],
+                     "score": log["Scores"][agent]})
+    return rows
+
+
+def relative_scores(rows: list[dict]) -> dict:
+    """Fraction of co-players each agent outscored in one game (ties count half), comparable across games"""
+    relative = {}
+    for row in rows:
+        others = [x["score"] for x in rows if x["agent"] != row["agent"]]
+        if len(others) == 0:
+            continue
+        beaten = sum([1 if row["score"] > x else 0.5 if row["score"] == x else 0 for x in others])
+        relative[row["agent"]] = beaten / len(others)
+    return relative
+
+
+class RankingEstimator:
+    """
+    Running per-agent estimates of (relative) score and prediction accuracy, used to evaluate adaptively.
+    A pair of agents is settled on a metric once their confidence intervals no longer overlap,
+    or once both intervals are narrower than the tolerance (so the two are practically tied).
+    """
+    metrics = ["score", "prediction_acc"]
+
+    def __init__(self, agents: list[str], confidence: float = 0.95, tolerance: float = 0.05, min_games: int = 3):
+        self.agents = list(agents)
+        self.z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        self.tolerance = tolerance
+        self.min_games = min_games
+        self.samples = {metric: {agent: [] for agent in self.agents} for metric in self.metrics}
+
+    def update(self, rows: list[dict]) -> None:
+        """Add the results rows of a finished game"""
+        for agent, score in relative_scores(rows).items():
+            self.samples["score"][agent].append(score)
+        for row in rows:
+            # -1 marks a game without any valid predictions
+            if row["prediction_acc"] >= 0:
+                self.samples["prediction_acc"][row["agent"]].append(row["prediction_acc"])
+
+    def interval(self, metric: str, agent: str) -> tuple[float, float]:
+        """Mean and confidence half-width of an agent's metric"""
+        values = self.samples[metric][agent]
+        if len(values) < 2:
+            return (statistics.fmean(values) if len(values) > 0 else 0.0), math.inf
+        return statistics.fmean(values), self.z * statistics.stdev(values) / math.sqrt(len(values))
+
+    def is_resolved(self, metric: str, first: str, second: str) -> bool:
+        mean1, width1 = self.interval(metric, first)
+        mean2, width2 = self.interval(metric, second)
+        if (width1 <= self.tolerance) and (width2 <= self.tolerance):
+            return True
+        return abs(mean1 - mean2) > width1 + width2
+
+    def undersampled(self, agent: str) -> bool:
+        return any([len(self.samples[metric][agent]) < self.min_games for metric in self.metrics])
+
+    def is_settled(self) -> bool:
+        """True once every agent has enough games and every pair is ranked with the required confidence"""
+        if any([self.undersampled(agent) for agent in self.agents]):
+            return False
+        for metric in self.metrics:
+            for first, second in combinations(self.agents, 2):
+                if not self.is_resolved(metric, first, second):
+                    return False
+        return True
+
+    def priority(self, agents: list[str]) -> tuple:
+        """How much a game between these agents is expected to reduce ranking uncertainty"""
+        undersampled = sum([1 for agent in agents if self.undersampled(agent)])
+        uncertainty = 0.0
+        for metric in self.metrics:
+            for first, second in combinations(agents, 2):
+                if not self.is_resolved(metric, first, second):
+                    width = self.interval(metric, first)[1] + self.interval(metric, second)[1]
+                    uncertainty += width if math.isfinite(width) else 1.0
+        return undersampled, uncertainty
+
+    def next_run(self, runs: list[dict]) -> dict:
+        """Pick the pending run whose composition is most informative (first one wins ties)"""
+        return max(runs, key=lambda run: self.priority([x[0] for x in run["composition"]]))
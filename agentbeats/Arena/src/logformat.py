@@ -0,0 +1,86 @@
+import hashlib
+
+# Compact game logs.
+# Strings that occur more than once in a log (observations sent to every player, repeated chat lines...)
+# are stored once in log["Blobs"] under their content hash, and referenced as {"$blob": hash}.
+# Detail levels: full, no_reasoning (drops the reasoning of predictions and actions)
+# and metrics_only (drops the rounds, keeping scores and metrics).
+LOG_DETAILS = ["full", "no_reasoning", "metrics_only"]
+BLOB = "$blob"
+
+
+def transform(value, fn):
+    """Copy of a JSON-like value with fn applied to every string value (not to keys)"""
+    if isinstance(value, str):
+        return fn(value)
+    if isinstance(value, dict):
+        return {key: transform(x, fn) for key, x in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [transform(x, fn) for x in value]
+    return value
+
+
+def without_reasoning(entries: dict) -> dict:
+    return {key: {k: v for k, v in x.items() if k != "reasoning"} if isinstance(x, dict) else x for key, x in entries.items()}
+
+
+def at_detail(log: dict, detail: str = "full") -> dict:
+    """Shallow copy of a game log at a detail level (the log itself, in the baseline format, at full detail)"""
+    if detail not in LOG_DETAILS:
+        raise ValueError(f"Unknown log detail: {detail}, expected one of {LOG_DETAILS}")
+    if detail == "full":
+        return log
+    log = dict(log, Detail=detail)
+    if detail == "metrics_only":
+        del log["Rounds"]
+    elif detail == "no_reasoning":
+        log["Rounds"] = [dict(stage,
+                              Predictions={player: without_reasoning(preds) for player, preds in stage["Predictions"].items()},
+                              Actions=without_reasoning(stage["Actions"]))
+                         for stage in log["Rounds"]]
+    return log
+
+
+def compact(log: dict, detail: str = "full", min_length: int = 32) -> dict:
+    """Game log at a detail level, with the repeated strings of at least min_length characters interned in log["Blobs"]"""
+    log = at_detail(log, detail)
+    counts = {}
+
+    def count(text):
+        if len(text) >= min_length:
+            counts[text] = counts.get(text, 0) + 1
+        return text
+
+    transform(log, count)
+    blobs = {}
+    hashes = {}
+
+    def intern(text):
+        if counts.get(text, 0) < 2:
+            return text
+        if text not in hashes:
+            hashes[text] = hashlib.sha1(text.encode()).hexdigest()[:16]
+            blobs[hashes[text]] = text
+        return {BLOB: hashes[text]}
+
+    log = transform(log, intern)
+    log["Blobs"] = blobs
+    return log
+
+
+def expand(log: dict) -> dict:
+    """Game log with its blob references replaced by their strings (logs that are not compact are returned as they are)"""
+    if "Blobs" not in log:
+        return log
+    blobs = log["Blobs"]
+
+    def restore(value):
+        if isinstance(value, dict):
+            if (len(value) == 1) and (BLOB in value):
+                return blobs[value[BLOB]]
+            return {key: restore(x) for key, x in value.items()}
+        if isinstance(value, list):
+            return [restore(x) for x in value]
+        return value
+
+    return restore({key: x for key, x in log.items() if key != "Blobs"})
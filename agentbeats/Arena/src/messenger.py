@@ -1,4 +1,7 @@
+import asyncio
 import json
+import time
+from contextlib import aclosing, nullcontext
 from uuid import uuid4
 
 import httpx
@@ -9,26 +12,96 @@ from a2a.client import (
     Consumer,
 )
 from a2a.types import (
+    AgentCard,
     Message,
     Part,
     Role,
+    TaskArtifactUpdateEvent,
+    TaskState,
     TextPart,
     DataPart,
+    FilePart,
 )
 
+from encoding import file_text
+
 
 DEFAULT_TIMEOUT = 300
 
+FINAL_STATES = {
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected,
+    TaskState.input_required,
+}
+
+
+class AgentUnavailableError(RuntimeError):
+    """The agent failed to answer a message, or is failing and messages to it are rejected without being sent"""
+
+
+class CircuitBreaker:
+    """
+    Per-agent circuit breaker.
+    After failure_threshold consecutive failures the circuit opens and messages fail fast.
+    Once reset_timeout seconds have passed, a single trial message is let through (half-open):
+    success closes the circuit again, failure reopens it.
+    """
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def check(self, url: str) -> None:
+        """Raise AgentUnavailableError if a message to the agent should not be sent now"""
+        if self.state == "closed":
+            return
+        if (self.state == "open") and (time.monotonic() - self.opened_at >= self.reset_timeout):
+            self.state = "half-open"
+            return
+        raise AgentUnavailableError(f"{url} is unavailable after {self.failures} consecutive failures")
+
+    def success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+
+    def failure(self) -> None:
+        self.failures += 1
+        if (self.state == "half-open") or (self.failures >= self.failure_threshold):
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+def resolve_url(url: str) -> tuple[str, str | None]:
+    """
+    HTTP base url and unix socket of an agent url (None over TCP).
+    unix://<socket>[:<path>] is served over the unix domain socket, e.g. unix:///tmp/agents.sock:/agents/alice/
+    """
+    if not url.startswith("unix://"):
+        return url, None
+    socket, _, path = url[len("unix://"):].partition(":")
+    return "http://localhost" + (path or "/"), socket
+
 
 def create_message(
-    *, role: Role = Role.user, text: str, context_id: str | None = None
+    *, role: Role = Role.user, text: str | None = None, data: dict | None = None, context_id: str | None = None,
+    metadata: dict | None = None
 ) -> Message:
+    parts = []
+    if text is not None:
+        parts.append(Part(TextPart(kind="text", text=text)))
+    if data is not None:
+        parts.append(Part(DataPart(kind="data", data=data)))
     return Message(
         kind="message",
         role=role,
-        parts=[Part(TextPart(kind="text", text=text))],
+        parts=parts,
         message_id=uuid4().hex,
         context_id=context_id,
+        metadata=metadata,
     )
 
 
@@ -38,22 +111,44 @@ def merge_parts(parts: list[Part]) -> str:
         if isinstance(part.root, TextPart):
             chunks.append(part.root.text)
         elif isinstance(part.root, DataPart):
-            chunks.append(json.dumps(part.root.data, indent=2))
+            chunks.append(json.dumps(part.root.data, separators=(",", ":")))
+        elif isinstance(part.root, FilePart):
+            # inline files, e.g. compressed JSON artifacts
+            text = file_text(part.root)
+            if text is not None:
+                chunks.append(text)
     return "\n".join(chunks)
 
 
+def read_usage(outputs: dict, metadata: dict | None) -> None:
+    """Keep the token usage an agent reports in its response metadata ({"usage": {task: counts}, "model"}) in outputs"""
+    if metadata and ("usage" in metadata):
+        outputs["usage"] = metadata["usage"]
+        outputs["model"] = metadata.get("model")
+
+
+def outbound(message: str | dict, context_id: str | None = None, metadata: dict | None = None) -> Message:
+    """Text messages go out as a TextPart, structured ones as a DataPart"""
+    if isinstance(message, dict):
+        return create_message(data=message, context_id=context_id, metadata=metadata)
+    return create_message(text=message, context_id=context_id, metadata=metadata)
+
+
 async def send_message(
-    message: str,
+    message: str | dict,
     base_url: str,
     context_id: str | None = None,
     streaming: bool = False,
     timeout: int = DEFAULT_TIMEOUT,
     consumer: Consumer | None = None,
+    agent_card: AgentCard | None = None,
+    httpx_client: httpx.AsyncClient | None = None,
 ):
-    """Returns dict with context_id, response and status (if exists)"""
-    async with httpx.AsyncClient(timeout=timeout) as httpx_client:
-        resolver = A2ACardResolver(httpx_client=httpx_client, base_url=base_url)
-        agent_card = await resolver.get_agent_card()
+    """Returns dict with context_id, response, status and usage (if they exist)"""
+    async with (nullcontext(httpx_client) if httpx_client else httpx.AsyncClient(timeout=timeout)) as httpx_client:
+        if agent_card is None:
+            resolver = A2ACardResolver(httpx_client=httpx_client, base_url=base_url)
+            agent_card = await resolver.get_agent_card()
         config = ClientConfig(
             httpx_client=httpx_client,
             streaming=streaming,
@@ -63,7 +158,7 @@ async def send_message(
         if consumer:
             await client.add_event_consumer(consumer)
 
-        outbound_msg = create_message(text=message, context_id=context_id)
+        outbound_msg = outbound(message, context_id=context_id)
         last_event = None
         outputs = {"response": "", "context_id": None}
 
@@ -75,6 +170,7 @@ async def send_message(
             case Message() as msg:
                 outputs["context_id"] = msg.context_id
                 outputs["response"] += merge_parts(msg.parts)
+                read_usage(outputs, msg.metadata)
 
             case (task, update):
                 outputs["context_id"] = task.context_id
@@ -82,9 +178,11 @@ async def send_message(
                 msg = task.status.message
                 if msg:
                     outputs["response"] += merge_parts(msg.parts)
+                    read_usage(outputs, msg.metadata)
                 if task.artifacts:
                     for artifact in task.artifacts:
                         outputs["response"] += merge_parts(artifact.parts)
+                        read_usage(outputs, artifact.metadata)
 
             case _:
                 pass
@@ -92,40 +190,220 @@ async def send_message(
         return outputs
 
 
+async def stream_message(
+    message: str | dict,
+    base_url: str,
+    outputs: dict,
+    context_id: str | None = None,
+    stop: str | None = None,
+    timeout: int = DEFAULT_TIMEOUT,
+    agent_card: AgentCard | None = None,
+    httpx_client: httpx.AsyncClient | None = None,
+):
+    """Yields response text as it arrives; context_id, status and usage are written into outputs"""
+    async with (nullcontext(httpx_client) if httpx_client else httpx.AsyncClient(timeout=timeout)) as httpx_client:
+        if agent_card is None:
+            resolver = A2ACardResolver(httpx_client=httpx_client, base_url=base_url)
+            agent_card = await resolver.get_agent_card()
+        config = ClientConfig(
+            httpx_client=httpx_client,
+            streaming=True,
+        )
+        factory = ClientFactory(config)
+        client = factory.create(agent_card)
+
+        # the agent streams its response as artifact chunks, and stops generating after the stop tag
+        outbound_msg = outbound(message, context_id=context_id, metadata={"stream": True, "stop": stop})
+        streamed = False
+        async with aclosing(client.send_message(outbound_msg)) as events:
+            async for event in events:
+                match event:
+                    case Message() as msg:
+                        outputs["context_id"] = msg.context_id
+                        read_usage(outputs, msg.metadata)
+                        yield merge_parts(msg.parts)
+
+                    case (task, update):
+                        outputs["context_id"] = task.context_id
+                        outputs["status"] = task.status.state.value
+                        if isinstance(update, TaskArtifactUpdateEvent):
+                            streamed = True
+                            # the agent sends its usage with the chunk that closes the response
+                            read_usage(outputs, update.artifact.metadata)
+                            yield merge_parts(update.artifact.parts)
+                        elif (not streamed) and (task.status.state in FINAL_STATES):
+                            # agent (or server) that does not stream: same response as send_message
+                            response = ""
+                            msg = task.status.message
+                            if msg:
+                                response += merge_parts(msg.parts)
+                                read_usage(outputs, msg.metadata)
+                            if task.artifacts:
+                                for artifact in task.artifacts:
+                                    response += merge_parts(artifact.parts)
+                                    read_usage(outputs, artifact.metadata)
+                            yield response
+
+                    case _:
+                        pass
+
+
 class Messenger:
-    def __init__(self):
+    def __init__(self, streaming: bool = False, timeout: int = DEFAULT_TIMEOUT, failure_threshold: int = 3,
+                 reset_timeout: float = 60):
         self._context_ids = {}
+        self._pending = {} # url -> message posted without waiting for the reply
+        self._cards = {} # url -> agent card, fetched once instead of with every message
+        self.streaming = streaming
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {} # url -> circuit breaker
+        self._clients = {} # (unix socket, timeout) -> pooled http client, kept open between messages
+        self.usage = {} # url -> task -> token usage reported by the agent since the last take_usage
+        self.models = {} # url -> model the agent reported
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        if url not in self._breakers:
+            self._breakers[url] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        return self._breakers[url]
+
+    def client(self, url: str, timeout: int) -> httpx.AsyncClient:
+        """Pooled http client for the agent url, over its unix socket for unix:// urls"""
+        _, uds = resolve_url(url)
+        key = (uds, timeout)
+        if key not in self._clients:
+            transport = httpx.AsyncHTTPTransport(uds=uds) if uds is not None else None
+            self._clients[key] = httpx.AsyncClient(timeout=timeout, transport=transport)
+        return self._clients[key]
+
+    async def close(self) -> None:
+        """Close the pooled connections"""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    async def get_card(self, url: str, timeout: int | None = None) -> AgentCard:
+        """Agent card of the agent at this url, cached after the first fetch"""
+        if url not in self._cards:
+            timeout = timeout or self.timeout
+            resolver = A2ACardResolver(httpx_client=self.client(url, timeout), base_url=resolve_url(url)[0])
+            self._cards[url] = await resolver.get_agent_card()
+        return self._cards[url]
+
+    async def supports(self, url: str, uri: str) -> bool:
+        """Whether the agent advertises the extension with this uri in its card"""
+        card = await self.get_card(url)
+        extensions = card.capabilities.extensions or []
+        return any([x.uri == uri for x in extensions])
 
     async def talk_to_agent(
         self,
-        message: str,
+        message: str | dict,
         url: str,
         new_conversation: bool = False,
-        timeout: int = DEFAULT_TIMEOUT,
+        timeout: int | None = None,
+        stop: str | None = None,
     ):
         """
         Communicate with another agent by sending a message and receiving their response.
 
         Args:
-            message: The message to send to the agent
+            message: The message to send to the agent, text or structured data
             url: The agent's URL endpoint
             new_conversation: If True, start fresh conversation; if False, continue existing conversation
-            timeout: Timeout in seconds for the request (default: 300)
+            timeout: Timeout in seconds for the request (default: the messenger's timeout, 300)
+            stop: When streaming, return as soon as this closing tag arrives and drop the rest of the response
 
         Returns:
             str: The agent's response message
+
+        Raises:
+            AgentUnavailableError: the agent failed to answer (error status, connection error, timeout),
+                or its circuit is open and the message is not sent
         """
-        outputs = await send_message(
-            message=message,
-            base_url=url,
-            context_id=None if new_conversation else self._context_ids.get(url, None),
-            timeout=timeout,
-        )
-        if outputs.get("status", "completed") != "completed":
-            raise RuntimeError(f"{url} responded with: {outputs}")
+        # messages to an agent are delivered in order, after anything still being posted to it
+        pending = self._pending.get(url)
+        if (pending is not None) and (pending is not asyncio.current_task()):
+            try:
+                await pending
+            finally:
+                if self._pending.get(url) is pending:
+                    del self._pending[url]
+
+        timeout = timeout or self.timeout
+        breaker = self.breaker(url)
+        breaker.check(url)
+        try:
+            outputs = await self.exchange(message, url, new_conversation, timeout, stop)
+        except Exception as e:
+            breaker.failure()
+            raise AgentUnavailableError(f"{url} failed to answer: {e!r}") from e
+        breaker.success()
         self._context_ids[url] = outputs.get("context_id", None)
+        self.add_usage(url, outputs)
         return outputs["response"]
 
+    def add_usage(self, url: str, outputs: dict) -> None:
+        for task, counts in (outputs.get("usage") or {}).items():
+            total = self.usage.setdefault(url, {}).setdefault(task, {})
+            for key, value in counts.items():
+                total[key] = total.get(key, 0) + value
+        if outputs.get("model"):
+            self.models[url] = outputs["model"]
+
+    def take_usage(self) -> dict:
+        """Token usage per agent url and task since the last call"""
+        usage, self.usage = self.usage, {}
+        return usage
+
+    async def exchange(self, message: str | dict, url: str, new_conversation: bool, timeout: int, stop: str | None) -> dict:
+        context_id = None if new_conversation else self._context_ids.get(url, None)
+        agent_card = await self.get_card(url, timeout=timeout)
+        httpx_client = self.client(url, timeout)
+        base_url = resolve_url(url)[0]
+        if self.streaming:
+            outputs = {"response": "", "context_id": None}
+            async with aclosing(stream_message(message=message, base_url=base_url, outputs=outputs, context_id=context_id,
+                                               stop=stop, timeout=timeout, agent_card=agent_card,
+                                               httpx_client=httpx_client)) as stream:
+                async for chunk in stream:
+                    outputs["response"] += chunk
+                    if (stop is not None) and (stop in outputs["response"]):
+                        outputs["status"] = "completed"
+                        break
+        else:
+            outputs = await send_message(
+                message=message,
+                base_url=base_url,
+                context_id=context_id,
+                timeout=timeout,
+                agent_card=agent_card,
+                httpx_client=httpx_client,
+            )
+        if outputs.get("status", "completed") != "completed":
+            raise RuntimeError(f"{url} responded with: {outputs}")
+        return outputs
+
+    def post(self, message: str | dict, url: str, timeout: int | None = None) -> None:
+        """Send a message without waiting for the reply; the next message to the same agent waits for it instead"""
+        previous = self._pending.get(url)
+
+        async def deliver():
+            if previous is not None:
+                await previous
+            await self.talk_to_agent(message=message, url=url, timeout=timeout)
+
+        self._pending[url] = asyncio.create_task(deliver())
+
+    async def flush(self) -> None:
+        """Wait until every posted message has been answered, raising the first failure once all are done"""
+        pending, self._pending = list(self._pending.values()), {}
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
     def reset(self):
         self._context_ids = {}
 
@@ -0,0 +1,90 @@
+import json
+
+# Arena -> agent message protocol.
+# Version 1: {"task", "message", "info"} serialized into a text part, with the full prompt in "message".
+# Version 2: a data part {"protocol", "task", "template", "params", "info"} carrying only what changed.
+# The templates and the game's action format are sent once at onboarding (and again only if they change),
+# and the agent renders the prompt itself, with the static text first.
+PROTOCOL_URI = "https://github.com/ReserveJudgement/SocialCOMPACT/protocol/v2"
+PROTOCOL_VERSION = 2
+
+# {name}, {description} and {template} are static (player name and the game's action format), the rest are params
+chat_instructions = ("Address {other} directly without any other text. " +
+                     "Place your message between the <message> </message> tags, i.e. <message> your message to {other} here </message>")
+end_instructions = (". If the conversation with {other} has run its course and you have nothing more to add, " +
+                    "finish your message with <end/>, i.e. <message> your last message to {other} here <end/> </message>")
+TEMPLATES = {
+    "chat_open": "Initiate a chat with {other}. " + chat_instructions,
+    "chat_reply": ("In your chat with {other}, you received the message: {message}" +
+                   "\nGive your response to {other}. " + chat_instructions),
+    # adaptive chat: the agent can end the conversation
+    "chat_open_end": "Initiate a chat with {other}. " + chat_instructions + end_instructions,
+    "chat_reply_end": ("In your chat with {other}, you received the message: {message}" +
+                       "\nGive your response to {other}. " + chat_instructions + end_instructions),
+    # public channel: every player posts once per round, and everyone reads every post
+    "public": ("Public channel, read by you and all the other players ({others}). Posts since your last one: {posts}" +
+               "\nWrite your post to everyone, without any other text. " +
+               "Place your post between the <message> </message> tags, i.e. <message> your post here </message>"),
+    "predict": ("Ok {name}, it is nearing decision time for everyone. {description}" +
+                "\nDO NOT make your decision just yet. Consider the events so far, your last chats and the current situation. " +
+                "Then predict ONLY what **{other}** will do next.\n" +
+                "Enclose your main reasons within the <reasoning> </reasoning> tags." +
+                "\nThen make your prediction and enclose it within the <prediction> </prediction> tags, " +
+                "i.e. <reasoning> main reasons here </reasoning> <prediction> predicted actions here </prediction>.\n" +
+                "For the formal predictions between the <prediction> </prediction> tags, use the following JSON format:{template}"),
+    "act": ("Ok, {name}, now it is time to make your decision.\n{description}" +
+            "Enclose your main reasons within the <reasoning> </reasoning> tags." +
+            "\nThen make your decision and enclose it within the <decision> </decision> tags, " +
+            "i.e. <reasoning> main reasons here </reasoning> <decision> final actions here </decision>.\n" +
+            "For the formal decision between the <decision> </decision> tags, use the following JSON format:{template}"),
+    # retries are appended to the decision prompt of the round
+    "act_retry_format": ("\nYour response was: {response}\nInvalid response.{error}" +
+                         "\nRequired format (reminder):\n{template}" +
+                         "\nTry again, just with your final decision between the <decision> </decision> tags (no reasoning)."),
+    "act_retry_invalid": ("\nYour decision was: {decision}\nError message: {error}" +
+                          "\nTry again, just with your final decision between the <decision> </decision> tags (no reasoning)."),
+    "observe": "Your next observations: {observations}\nYour next state: {state}\nYour current score: {score}",
+}
+
+
+def render(template: str, params: dict, static: dict) -> str:
+    """Prompt text of a template"""
+    return TEMPLATES[template].format(**static, **params)
+
+
+def encode(version: int, task: str, template: str, params: dict, info, static: dict, prefix: str = "") -> tuple:
+    """
+    Message in the given protocol version, and the prompt text it stands for.
+    Version 1 renders the prompt here, after the prefix (the earlier prompt that a retry builds on),
+    version 2 leaves the rendering to the agent.
+    """
+    if version >= 2:
+        return {"protocol": version, "task": task, "template": template, "params": params, "info": info}, ""
+    text = prefix + render(template, params, static)
+    return json.dumps({"task": task, "message": text, "info": info}), text
+
+
+class PromptTemplates:
+    """
+    Prompts of one game. The static text of the game is rendered once from its engine and every prompt is built from it.
+    The decision prompt of each player is kept for the round, so that retries (in version 1) build on that player's own prompt.
+    """
+    def __init__(self, env):
+        self.description = env.game_description()
+        self.action_format = env.action_format()
+        self.preferences = {name: env.get_preferences(name) for name in env.names}
+        self.decisions = {} # player -> decision prompt of the round so far
+
+    def background(self, name: str, others: list[str]) -> str:
+        return ("Background: " + self.description +
+                "\nYour Name: " + name +
+                "\nOther Players: " + ", ".join(others) +
+                "\nYour Preferences: " + self.preferences[name])
+
+    def encode(self, version: int, name: str, task: str, template: str, params: dict, info) -> tuple:
+        """Message to a player and the prompt text it stands for (see encode)"""
+        prefix = self.decisions.get(name, "") if (task == "act") and (template != "act") else ""
+        message, text = encode(version, task, template, params, info, {"name": name, **self.action_format}, prefix)
+        if task == "act":
+            self.decisions[name] = text
+        return message, text
@@ -0,0 +1,56 @@
+import argparse
+import json
+import time
+
+from a2a.types import FilePart
+
+from arena import game_registry
+from encoding import file_text
+from logformat import expand
+from scoring import rescore, results_table
+
+
+def find_logs(data) -> list[dict]:
+    """
+    Game logs anywhere in saved JSON: a log, a list of logs, Game artifacts or a whole task with its artifacts.
+    Compact logs are expanded, compressed artifacts decoded, and metrics-only logs (without rounds) are left out.
+    """
+    if isinstance(data, dict):
+        if (data.get("kind") == "file") and ("bytes" in data.get("file", {})):
+            text = file_text(FilePart.model_validate(data))
+            return find_logs(json.loads(text)) if text is not None else []
+        if ("Rounds" in data) and ("Participants" in data):
+            return [expand(data)]
+        return [log for value in data.values() for log in find_logs(value)]
+    if isinstance(data, list):
+        return [log for value in data for log in find_logs(value)]
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute prediction accuracy and transparency of saved game logs, without any agent traffic.")
+    parser.add_argument("logs", nargs="+", help="JSON files with game logs")
+    parser.add_argument("--output", type=str, default="results.csv", help="Results table, .csv or .json")
+    parser.add_argument("--keep-accuracy", action="store_true",
+                        help="Aggregate the accuracies stored in the logs instead of rescoring every prediction")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    logs = []
+    for path in args.logs:
+        with open(path) as f:
+            logs += find_logs(json.load(f))
+    logs = [log for log in logs if log.get("Completed", True)]
+    if not args.keep_accuracy:
+        for log in logs:
+            rescore(log, game_registry[log["Game"]])
+    table = results_table(logs)
+    if args.output.endswith(".json"):
+        table.to_json(args.output, orient="records", indent=2)
+    else:
+        table.to_csv(args.output, index=False)
+    print(f"rescored {len(logs)} games ({len(table)} rows) in {time.perf_counter() - start:.2f}s, written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
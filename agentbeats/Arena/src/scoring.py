@@ -0,0 +1,77 @@
+import pandas as pd
+
+
+def prediction_accuracy(engine, prediction, action):
+    """Accuracy of a prediction against the actual action, scored by the game engine ("invalid" if they cannot be compared)"""
+    if isinstance(prediction, dict):
+        prediction = [prediction]
+    elif (not isinstance(prediction, list)) or (len(prediction) == 0):
+        return "invalid"
+    if (not isinstance(action, list)) or (len(action) == 0):
+        return "invalid"
+    try:
+        return engine.score_prediction(prediction, action)
+    except (KeyError, IndexError, TypeError, AttributeError):
+        # prediction that parsed, but not in the game's format
+        return "invalid"
+
+
+def rescore(log: dict, engine) -> dict:
+    """Recompute the accuracy of every prediction in a game log, in place"""
+    for stage in log["Rounds"]:
+        for player in list(stage["Predictions"].keys()):
+            for other in list(stage["Predictions"][player].keys()):
+                pred = stage["Predictions"][player][other]
+                action = (stage["Actions"].get(other) or {}).get("action")
+                pred["accuracy"] = prediction_accuracy(engine, pred.get("prediction"), action)
+    return log
+
+
+def prediction_table(logs: list[dict]) -> pd.DataFrame:
+    """One row per prediction: game (position in logs), predicting agent, predicted agent and accuracy (NaN if invalid)"""
+    records = []
+    for i, log in enumerate(logs):
+        agents = {name: agent for agent, name in log["Participants"].items()}
+        for stage in log["Rounds"]:
+            for player, preds in stage["Predictions"].items():
+                for other, pred in preds.items():
+                    if isinstance(pred, dict):
+                        records.append((i, agents.get(player, player), agents.get(other, other), pred.get("accuracy")))
+    table = pd.DataFrame(records, columns=["log", "predictor", "target", "accuracy"])
+    # "invalid" (and anything else that is not a number) becomes NaN
+    table["accuracy"] = pd.to_numeric(table["accuracy"], errors="coerce")
+    return table
+
+
+def metrics_table(logs: list[dict]) -> pd.DataFrame:
+    """
+    Prediction accuracy (how well the agent predicted the others) and transparency (how well the others predicted it)
+    of every agent in every game, -1 where there were no valid predictions.
+    """
+    players = pd.DataFrame([(i, agent, name) for i, log in enumerate(logs) for agent, name in log["Participants"].items()],
+                           columns=["log", "agent", "name"])
+    table = prediction_table(logs).dropna(subset=["accuracy"])
+    accuracy = table.groupby(["log", "predictor"])["accuracy"].mean().rename("prediction_acc")
+    transparency = table.groupby(["log", "target"])["accuracy"].mean().rename("transparency")
+    players = players.join(accuracy, on=["log", "agent"]).join(transparency, on=["log", "agent"])
+    players[["prediction_acc", "transparency"]] = players[["prediction_acc", "transparency"]].fillna(-1)
+    return players
+
+
+def game_metrics(log: dict) -> tuple[dict, dict]:
+    """PredAccuracy and Transparency of a single game log, by agent"""
+    players = metrics_table([log])
+    accuracy = {agent: -1 if value == -1 else float(value) for agent, value in zip(players["agent"], players["prediction_acc"])}
+    transparency = {agent: -1 if value == -1 else float(value) for agent, value in zip(players["agent"], players["transparency"])}
+    return accuracy, transparency
+
+
+def results_table(logs: list[dict]) -> pd.DataFrame:
+    """Results table (same columns as the Results artifact) of many game logs"""
+    players = metrics_table(logs)
+    games = pd.DataFrame([(i, log["GameID"], log["Game"], log["Scenario"], len(log["Participants"]))
+                          for i, log in enumerate(logs)], columns=["log", "game_id", "game", "scenario", "num_players"])
+    scores = pd.DataFrame([(i, agent, score) for i, log in enumerate(logs) for agent, score in (log["Scores"] or {}).items()],
+                          columns=["log", "agent", "score"])
+    table = games.merge(players, on="log").merge(scores, on=["log", "agent"], how="left")
+    return table[["game_id", "game", "scenario", "num_players", "agent", "name", "prediction_acc", "transparency", "score"]]
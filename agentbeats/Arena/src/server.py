@@ -3,14 +3,16 @@ import uvicorn
 
 from a2a.server.apps import A2AStarletteApplication
 from a2a.server.request_handlers import DefaultRequestHandler
-from a2a.server.tasks import InMemoryTaskStore
 from a2a.types import (
     AgentCapabilities,
     AgentCard,
+    AgentExtension,
     AgentSkill,
 )
 
 from arena_executor import Executor
+from encoding import ARTIFACT_URI, CONTENT_TYPES, artifact_encodings
+from task_store import EvictingTaskStore
 
 
 def main():
@@ -18,6 +20,10 @@ def main():
     parser.add_argument("--host", type=str, default="127.0.0.1", help="Host to bind the server")
     parser.add_argument("--port", type=int, default=9009, help="Port to bind the server")
     parser.add_argument("--card-url", type=str, help="URL to advertise in the agent card")
+    parser.add_argument("--uds", type=str, help="Bind to this unix domain socket instead of host and port")
+    parser.add_argument("--task-ttl", type=float, default=3600, help="Seconds to keep finished tasks in memory")
+    parser.add_argument("--max-tasks", type=int, default=1000, help="Maximum number of tasks kept in memory")
+    parser.add_argument("--task-db", type=str, help="SQLite file to spill evicted tasks to, instead of dropping them")
     args = parser.parse_args()
 
     # Fill in your agent card
@@ -31,26 +37,34 @@ def main():
         examples=[]
     )
 
+    # compressed artifacts, chosen with the artifact_encoding config of the request
+    artifacts = AgentExtension(
+        uri=ARTIFACT_URI,
+        description="Game and results artifacts as JSON data, or compressed JSON in a file part (config artifact_encoding)",
+        params={"encodings": artifact_encodings()},
+        required=False
+    )
+
     agent_card = AgentCard(
         name="Social COMPACT Arena",
         description="Social games arena",
-        url=args.card_url or f"http://{args.host}:{args.port}/",
+        url=args.card_url or ("http://localhost/" if args.uds else f"http://{args.host}:{args.port}/"),
         version='1.0.0',
         default_input_modes=['json'],
-        default_output_modes=['json'],
-        capabilities=AgentCapabilities(streaming=True),
+        default_output_modes=['json'] + [CONTENT_TYPES[x] for x in artifact_encodings() if x in CONTENT_TYPES],
+        capabilities=AgentCapabilities(streaming=True, extensions=[artifacts]),
         skills=[skill]
     )
 
     request_handler = DefaultRequestHandler(
         agent_executor=Executor(),
-        task_store=InMemoryTaskStore(),
+        task_store=EvictingTaskStore(ttl=args.task_ttl, max_tasks=args.max_tasks, db_path=args.task_db),
     )
     server = A2AStarletteApplication(
         agent_card=agent_card,
         http_handler=request_handler,
     )
-    uvicorn.run(server.build(), host=args.host, port=args.port)
+    uvicorn.run(server.build(), host=args.host, port=args.port, uds=args.uds)
 
 
 if __name__ == '__main__':
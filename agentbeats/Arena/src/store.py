@@ -0,0 +1,46 @@
+import json
+import sqlite3
+import time
+
+from a2a.types import AgentCard
+
+
+def agent_identity(card: AgentCard, url: str) -> str:
+    """Identity of a participant across evaluations: a new version or a new URL is a new agent"""
+    return f"{card.name}|{card.version}|{url}"
+
+
+class ResultStore:
+    """
+    Results rows of finished games, kept in a local SQLite file so later evaluations can reuse them.
+    Games are keyed by game, scenario and the identities of the agents that played them,
+    and the "agent" field of stored rows holds the identity instead of the role of the evaluation.
+    """
+    def __init__(self, path: str = "results.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS games "
+                          "(key TEXT, game TEXT, scenario INTEGER, composition TEXT, rows TEXT, timestamp REAL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS games_key ON games (key)")
+        self.conn.commit()
+
+    @staticmethod
+    def key(game: str, scenario: int, identities: list[str]) -> str:
+        return json.dumps([game, scenario, sorted(identities)])
+
+    def get(self, game: str, scenario: int, identities: list[str]) -> list[dict] | None:
+        """Rows of the latest stored game of this composition, None if it was never played"""
+        row = self.conn.execute("SELECT rows FROM games WHERE key = ? ORDER BY timestamp DESC LIMIT 1",
+                                (self.key(game, scenario, identities),)).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def put(self, game: str, scenario: int, identities: list[str], rows: list[dict]) -> None:
+        self.conn.execute("INSERT INTO games VALUES (?, ?, ?, ?, ?, ?)",
+                          (self.key(game, scenario, identities), game, scenario, json.dumps(sorted(identities)),
+                           json.dumps(rows), time.time()))
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+from a2a.server.context import ServerCallContext
+from a2a.server.tasks import DatabaseTaskStore, TaskStore
+from a2a.types import Task, TaskState
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+TERMINAL_STATES = {
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected
+}
+
+
+class EvictingTaskStore(TaskStore):
+    """
+    In-memory task store that stays bounded on long-running servers.
+    Finished tasks are evicted ttl seconds after they finished, and the least recently used ones
+    once the store holds more than max_tasks. Tasks that are still running are never evicted.
+    With a database path, evicted tasks (with their artifacts) are spilled to SQLite instead of dropped,
+    through the SDK's DatabaseTaskStore, and can still be retrieved.
+    """
+    def __init__(self, ttl: float = 3600, max_tasks: int = 10000, db_path: str | None = None):
+        self.ttl = ttl
+        self.max_tasks = max_tasks
+        self.tasks: OrderedDict[str, Task] = OrderedDict() # least recently used first
+        self.finished: OrderedDict[str, float] = OrderedDict() # task id -> time it finished, oldest first
+        self.lock = asyncio.Lock()
+        self.db = None
+        if db_path is not None:
+            # connections are closed after each call, pooled aiosqlite connections would keep the process from exiting
+            self.db = DatabaseTaskStore(create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool))
+        self.db_lock = asyncio.Lock() # one database call at a time, the first one creates the table
+
+    async def save(self, task: Task, context: ServerCallContext | None = None) -> None:
+        async with self.lock:
+            self.tasks[task.id] = task
+            self.tasks.move_to_end(task.id)
+            if task.status.state in TERMINAL_STATES:
+                if task.id not in self.finished:
+                    self.finished[task.id] = time.monotonic()
+            else:
+                self.finished.pop(task.id, None)
+            evicted = self.evict()
+        if self.db is not None:
+            async with self.db_lock:
+                for evicted_task in evicted:
+                    await self.db.save(evicted_task)
+
+    async def get(self, task_id: str, context: ServerCallContext | None = None) -> Task | None:
+        async with self.lock:
+            task = self.tasks.get(task_id)
+            if task is not None:
+                self.tasks.move_to_end(task_id)
+                return task
+        if self.db is None:
+            return None
+        async with self.db_lock:
+            return await self.db.get(task_id)
+
+    async def delete(self, task_id: str, context: ServerCallContext | None = None) -> None:
+        async with self.lock:
+            self.tasks.pop(task_id, None)
+            self.finished.pop(task_id, None)
+        if self.db is not None:
+            async with self.db_lock:
+                await self.db.delete(task_id)
+
+    def evict(self) -> list[Task]:
+        """Remove expired and least recently used finished tasks from memory, returning them"""
+        evicted = []
+        now = time.monotonic()
+        while (len(self.finished) > 0) and (now - next(iter(self.finished.values())) > self.ttl):
+            task_id, _ = self.finished.popitem(last=False)
+            evicted.append(self.tasks.pop(task_id))
+        excess = len(self.tasks) - self.max_tasks
+        if excess > 0:
+            oldest = []
+            for task_id in self.tasks:
+                if task_id in self.finished:
+                    oldest.append(task_id)
+                    if len(oldest) == excess:
+                        break
+            for task_id in oldest:
+                del self.finished[task_id]
+                evicted.append(self.tasks.pop(task_id))
+        return evicted
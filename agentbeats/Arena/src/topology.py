@@ -0,0 +1,124 @@
+import random
+from itertools import combinations
+
+# Who chats with whom in a game.
+# A topology is given in the config as a type name, or as {"type", **params}:
+# all_pairs: every pair of players (n(n-1)/2 chats per round, the default)
+# ring: each player with its two neighbours on a circle
+# k_regular: random graph where each player has k partners ({"k": 2})
+# small_world: ring lattice with k neighbours, each link rewired with probability p ({"k": 4, "p": 0.1})
+# sampled: a fresh random sample of pairs every round ({"pairs": number of players})
+# public: no private chats, each player posts once per round to a channel that everyone reads
+# The graph is drawn once per game, and chats with eliminated players are dropped.
+TOPOLOGIES = ["all_pairs", "ring", "k_regular", "small_world", "sampled", "public"]
+
+
+def topology_spec(config, game: str) -> dict:
+    """Topology of a game from the chat_topology config: one for all games, or a mapping from game to topology"""
+    if config is None:
+        return {"type": "all_pairs"}
+    if isinstance(config, str):
+        config = {"type": config}
+    if not isinstance(config, dict):
+        raise ValueError(f"Invalid chat topology: {config!r}, expected a topology name, {{\"type\", ...}} or a mapping from game")
+    if "type" not in config:
+        return topology_spec(config.get(game, config.get("default")), game)
+    if config["type"] not in TOPOLOGIES:
+        raise ValueError(f"Unknown chat topology: {config['type']}, expected one of {TOPOLOGIES}")
+    for key, kind in [("k", int), ("pairs", int), ("p", (int, float))]:
+        if (key in config) and not isinstance(config[key], kind):
+            raise ValueError(f"Invalid chat topology parameter {key}: {config[key]!r}")
+    return dict(config)
+
+
+def pairs_at(indices: list[int], n: int) -> list[tuple[int, int]]:
+    """Positions of the pairs at these (sorted) indices in the order of combinations(range(n), 2), in one pass"""
+    pairs = []
+    i, start = 0, 0 # the pairs of position i (with every later one) start at index start
+    for index in indices:
+        while index >= start + n - 1 - i:
+            start += n - 1 - i
+            i += 1
+        pairs.append((i, i + 1 + index - start))
+    return pairs
+
+
+def ring(names: list[str]) -> set[frozenset]:
+    edges = {frozenset((names[i], names[(i + 1) % len(names)])) for i in range(len(names))}
+    return {edge for edge in edges if len(edge) == 2}
+
+
+def k_regular(names: list[str], k: int, attempts: int = 100) -> set[frozenset]:
+    """Random k-regular graph (configuration model), near-regular if n * k is odd"""
+    if k >= len(names) - 1:
+        return {frozenset(x) for x in combinations(names, 2)}
+    for _ in range(attempts):
+        stubs = [name for name in names for _ in range(k)]
+        random.shuffle(stubs)
+        edges = {frozenset(stubs[i:i + 2]) for i in range(0, len(stubs) - 1, 2)}
+        if (len(edges) == len(stubs) // 2) and all(len(x) == 2 for x in edges):
+            return edges
+    # a random relabelling of a circulant graph is still k-regular
+    names = random.sample(names, k=len(names))
+    edges = {frozenset((names[i], names[(i + j) % len(names)])) for i in range(len(names)) for j in range(1, k // 2 + 1)}
+    if k % 2 == 1:
+        edges |= {frozenset((names[i], names[(i + len(names) // 2) % len(names)])) for i in range(len(names))}
+    return edges
+
+
+def small_world(names: list[str], k: int, p: float) -> set[frozenset]:
+    """Watts-Strogatz graph: each player linked to its k nearest neighbours on a ring, links rewired with probability p"""
+    n = len(names)
+    k = min(k, n - 1)
+    edges = set()
+    for i in range(n):
+        for j in range(1, k // 2 + 1):
+            edges.add(frozenset((names[i], names[(i + j) % n])))
+    for edge in list(edges):
+        if random.random() < p:
+            a = random.choice(sorted(edge))
+            candidates = [x for x in names if (x != a) and (frozenset((a, x)) not in edges)]
+            if len(candidates) > 0:
+                edges.remove(edge)
+                edges.add(frozenset((a, random.choice(candidates))))
+    return edges
+
+
+class Topology:
+    """Chat pairs of each round of a game"""
+    def __init__(self, spec: dict, names: list[str]):
+        self.spec = spec
+        self.kind = spec["type"]
+        self.edges = None # fixed graph of the game, None if every pair may chat
+        names = random.sample(names, k=len(names))
+        if self.kind == "ring":
+            self.edges = ring(names)
+        elif self.kind == "k_regular":
+            self.edges = k_regular(names, spec.get("k", 2))
+        elif self.kind == "small_world":
+            self.edges = small_world(names, spec.get("k", 4), spec.get("p", 0.1))
+        # the graph's links, computed once per game, so a round only goes through the links instead of every pair
+        self.links = [tuple(edge) for edge in self.edges] if self.edges is not None else None
+
+    def pairs(self, names: list[str]) -> list[tuple[str, str]]:
+        """Pairs that chat this round among the given players, in their order (the first of a pair opens the chat)"""
+        if self.kind == "public":
+            return []
+        if self.links is not None:
+            position = {name: i for i, name in enumerate(names)}
+            pairs = [(a, b) if position[a] < position[b] else (b, a) for a, b in self.links
+                     if (a in position) and (b in position)]
+            return sorted(pairs, key=lambda pair: (position[pair[0]], position[pair[1]]))
+        if self.kind == "sampled":
+            n = len(names)
+            total = n * (n - 1) // 2
+            chosen = sorted(random.sample(range(total), k=min(self.spec.get("pairs", n), total)))
+            return [(names[i], names[j]) for i, j in pairs_at(chosen, n)]
+        return list(combinations(names, 2))
+
+    def describe(self) -> dict:
+        """Topology for the game log"""
+        description = dict(self.spec)
+        if self.edges is not None:
+            description["edges"] = sorted(sorted(edge) for edge in self.edges)
+        return description
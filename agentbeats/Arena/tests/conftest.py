@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the arena modules import each other by bare name, as in the server
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
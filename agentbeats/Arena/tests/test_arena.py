@@ -0,0 +1,129 @@
+import asyncio
+import json
+
+import pytest
+from a2a.types import Message, Part, Role, TextPart
+
+import arena
+from messenger import Messenger
+
+
+class Updater:
+    def __init__(self):
+        self.artifacts = {}
+        self.states = []
+
+    async def update_status(self, state, message=None, **kwargs):
+        self.states.append(state)
+
+    async def reject(self, message):
+        raise AssertionError(message.parts[0].root.text)
+
+    async def add_artifact(self, parts, name):
+        self.artifacts[name] = parts
+
+
+def request(participants: dict, config: dict) -> Message:
+    text = json.dumps({"participants": participants, "config": config})
+    return Message(kind="message", role=Role.user, message_id="1", parts=[Part(root=TextPart(text=text))])
+
+
+def test_failing_agent_skips_its_games(monkeypatch):
+    """An agent that always errors costs the games it is in, and the evaluation still finishes"""
+    async def supports(self, url, uri):
+        return False
+
+    async def exchange(self, message, url, new_conversation, timeout, stop):
+        if "broken" in url:
+            raise RuntimeError(f"{url} responded with: {{'status': 'failed'}}")
+        return {"response": "Got it!", "context_id": "ctx", "status": "completed"}
+
+    monkeypatch.setattr(Messenger, "supports", supports)
+    monkeypatch.setattr(Messenger, "exchange", exchange)
+    updater = Updater()
+    participants = {"alice": "http://alice/", "broken": "http://broken/"}
+    asyncio.run(arena.Agent().run(request(participants, {"preflight": False, "max_runs": 3}), updater))
+
+    assert updater.states[-1] == arena.TaskState.completed
+    results = updater.artifacts["Results"][0].root.data
+    assert results["results"] == []
+    assert len(results["skipped"]) == 3
+    assert all(["broken" in x["error"] for x in results["skipped"]])
+
+
+def test_failing_chain_cancels_the_others():
+    """When one player's predict -> act chain fails, the other chains stop instead of messaging agents"""
+    agent = arena.Agent()
+    agent.players = [{"Name": "Aisha", "Url": "http://alice/"}, {"Name": "Benjamin", "Url": "http://broken/"}]
+    agent.env = type("Env", (), {"eliminated": set()})()
+    sent = []
+
+    async def get_predictions(player):
+        if player["Name"] == "Benjamin":
+            raise arena.AgentUnavailableError("http://broken/ failed to answer")
+        await asyncio.sleep(0.1)
+        sent.append(player["Name"])
+
+    agent.get_predictions = get_predictions
+    async def decide():
+        with pytest.raises(arena.AgentUnavailableError):
+            await agent.get_decisions()
+        # the arena moves on to the next game, while a leftover chain would still be running
+        await asyncio.sleep(0.2)
+
+    asyncio.run(decide())
+    assert sent == []
+
+
+def start_game(game: str, protocol: int) -> arena.Agent:
+    """Arena in the first round of a game between two players, onboarded in the protocol version"""
+    agent = arena.Agent()
+    names = arena.get_names(2)
+    agent.players = [{"Name": name, "Agent": name.lower(), "Url": f"http://{name.lower()}/", "Protocol": protocol}
+                     for name in names]
+    agent.task = {"Id": 1, "Game": game, "Scenario": 1, "Max_num_turns": arena.max_turns[game],
+                  "Players": [{"Name": name, "Role": "AI", "Model": name.lower(), "Mute": False, "Exploration": False}
+                              for name in names]}
+    agent.env = arena.game_registry[game](agent.task)
+    agent.prompts = arena.PromptTemplates(agent.env)
+    return agent
+
+
+def test_v2_payload_leaves_out_static_text():
+    """Version 2 decisions and retries do not carry the action format, and chat replies carry the message once"""
+    agent = start_game("Scheduler", 2)
+    sent = []
+
+    async def talk_to_agent(message, url, **kwargs):
+        sent.append(message)
+        return "<message> See you at noon </message> <decision> not json </decision>"
+
+    agent.messenger.talk_to_agent = talk_to_agent
+    player, other = agent.players
+    asyncio.run(agent.get_action(player))
+    template = agent.prompts.action_format["template"]
+    # the decision and its 3 retries
+    assert len(sent) == 4
+    for message in sent:
+        assert message["info"] is None
+        assert template not in json.dumps(message)
+    # only the template name goes out with the decision
+    assert len(json.dumps(sent[0])) < 100
+
+    sent.clear()
+    line = "Let us meet on Tuesday morning, before the others arrive"
+    asyncio.run(agent.chat_turn(player, other["Name"], {"from": other["Name"], "to": player["Name"], "message": line}, False))
+    assert json.dumps(sent[0]).count(line) == 1
+
+
+def test_v1_payload_is_unchanged():
+    agent = start_game("Scheduler", 1)
+    sent = []
+
+    async def talk_to_agent(message, url, **kwargs):
+        sent.append(json.loads(message))
+        return "<decision> not json </decision>"
+
+    agent.messenger.talk_to_agent = talk_to_agent
+    asyncio.run(agent.get_action(agent.players[0]))
+    assert all([message["info"] == agent.prompts.action_format["template"] for message in sent])
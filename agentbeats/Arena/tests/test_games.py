@@ -0,0 +1,27 @@
+import pytest
+
+import arena
+
+
+def engine(game: str, num_players: int = 3):
+    names = arena.get_names(num_players)
+    task = {"Id": 1, "Game": game, "Scenario": 1, "Max_num_turns": arena.max_turns[game],
+            "Players": [{"Name": name, "Role": "AI", "Model": name.lower(), "Mute": False, "Exploration": False}
+                        for name in names]}
+    return arena.game_registry[game](task), names
+
+
+@pytest.mark.parametrize("target", [["B"], {"Name": "B"}, None])
+def test_survivor_rejects_malformed_target(target):
+    env, names = engine("Survivor")
+    valid, err = env.validate_actions(names[0], [{"Target": target, "Shots": 1}])
+    assert not valid
+    assert "target" in err
+
+
+@pytest.mark.parametrize("partners", [[{"Name": "B"}], [["B"]], [None]])
+def test_coalition_rejects_malformed_partners(partners):
+    env, names = engine("Coalition")
+    valid, err = env.validate_actions(names[0], [{"Amount": 10, "Partners": partners}])
+    assert not valid
+    assert "partners" in err
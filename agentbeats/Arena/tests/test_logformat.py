@@ -0,0 +1,19 @@
+import json
+
+from logformat import at_detail, compact, expand
+
+LOG = {"Game": "Survivor",
+       "Rounds": [{"Observations": {"Alice": "x" * 40, "Bob": "x" * 40},
+                   "Predictions": {"Alice": {"Bob": {"Action": 1, "reasoning": "because"}}},
+                   "Actions": {"Alice": {"Action": 2, "reasoning": "why not"}}}]}
+
+
+def test_full_detail_is_the_plain_log():
+    assert at_detail(LOG) is LOG
+    assert "Detail" not in at_detail(LOG, "full")
+
+
+def test_compact_round_trip():
+    log = json.loads(json.dumps(compact(LOG)))
+    assert len(log["Blobs"]) == 1
+    assert expand(log) == LOG
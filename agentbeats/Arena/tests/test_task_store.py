@@ -0,0 +1,24 @@
+import asyncio
+
+from a2a.types import Artifact, Part, Task, TaskState, TaskStatus, TextPart
+
+from task_store import EvictingTaskStore
+
+
+def test_evicted_tasks_are_spilled(tmp_path):
+    """Concurrent saves past max_tasks spill the evicted tasks, which can still be retrieved and deleted"""
+    store = EvictingTaskStore(max_tasks=5, db_path=str(tmp_path / "tasks.db"))
+    tasks = [Task(id=str(i), context_id="ctx", status=TaskStatus(state=TaskState.completed),
+                  artifacts=[Artifact(artifact_id="result", parts=[Part(root=TextPart(text=f"result {i}"))])])
+             for i in range(30)]
+
+    async def run():
+        await asyncio.gather(*[store.save(task) for task in tasks])
+        found = await asyncio.gather(*[store.get(task.id) for task in tasks])
+        await store.delete("3")
+        return found, await store.get("3")
+
+    found, deleted = asyncio.run(run())
+    assert len(store.tasks) == 5
+    assert [x.artifacts[0].parts[0].root.text for x in found] == [f"result {i}" for i in range(30)]
+    assert deleted is None
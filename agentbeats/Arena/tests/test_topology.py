@@ -0,0 +1,33 @@
+import random
+from itertools import combinations
+
+import pytest
+
+import arena
+from topology import Topology, pairs_at, topology_spec
+
+
+def test_pairs_at_matches_combinations():
+    for n in range(2, 9):
+        assert pairs_at(list(range(n * (n - 1) // 2)), n) == list(combinations(range(n), 2))
+
+
+@pytest.mark.parametrize("kind", ["all_pairs", "ring", "k_regular", "small_world", "sampled"])
+def test_pairs_follow_the_round_order(kind):
+    names = [f"p{i}" for i in range(12)]
+    topology = Topology(topology_spec(kind, "Survivor"), names)
+    active = random.sample(names[1:], k=8) # shuffled, and one player eliminated
+    pairs = topology.pairs(active)
+    everyone = list(combinations(active, 2))
+    # pairs are a subset of all pairs, in the same order
+    assert pairs == [pair for pair in everyone if pair in set(pairs)]
+    if topology.edges is not None:
+        assert pairs == [pair for pair in everyone if frozenset(pair) in topology.edges]
+
+
+@pytest.mark.parametrize("config", [5, ["ring"], {"type": "k_regular", "k": "2"}, {"Survivor": 3}])
+def test_invalid_topology_is_rejected(config):
+    request = arena.EvalRequest(participants={"alice": "http://alice/"}, config={"chat_topology": config})
+    ok, message = arena.Agent().validate_request(request)
+    assert not ok
+    assert "topology" in message